@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from rules_cache import MACHINE_TYPES, parse_machine
+
+DEFAULT_CHUNK_SIZE = 1024
+DEFAULT_STEP_LIMIT = 1000
+
+# Set once per worker process by _init_worker.
+_machine = None
+_machine_type = None
+_step_limit = DEFAULT_STEP_LIMIT
+_detect_loops = False
+
+
+def run_chunk(machine, machine_type, strings, step_limit=DEFAULT_STEP_LIMIT, detect_loops=False):
+    """Returns the result for every string, "Accepted"/"Rejected" style."""
+    if machine_type == 'tm':
+        results = []
+        for string in strings:
+            try:
+                results.append(machine.simulate(string, step_limit, detect_loops))
+            except ValueError as e:
+                results.append(f"Error: {e}")
+        return results
+    if machine_type == 'pda':
+        return [machine.decide(string) for string in strings]
+    if machine_type == 'dfa':
+        accepted = machine.simulate_many(strings)
+    else:
+        # The bitset form is compiled when the NFA is built, once per worker.
+        accepted = [machine.simulate_bitset(string) for string in strings]
+    return ['Accepted' if a else 'Rejected' for a in accepted]
+
+
+def _load_machine(machine_type, rules_file, pda_limits):
+    machine = parse_machine(machine_type, rules_file)
+    if machine_type == 'pda' and pda_limits is not None:
+        machine.set_limits(*pda_limits)
+    return machine
+
+
+def _init_worker(machine_type, rules_file, step_limit, detect_loops, pda_limits):
+    global _machine, _machine_type, _step_limit, _detect_loops
+    _machine = _load_machine(machine_type, rules_file, pda_limits)
+    _machine_type = machine_type
+    _step_limit = step_limit
+    _detect_loops = detect_loops
+
+
+def _run_worker_chunk(index, strings):
+    return index, run_chunk(_machine, _machine_type, strings, _step_limit, _detect_loops)
+
+
+def _read_chunks(lines, chunk_size):
+    strings = (line.rstrip('\r\n') for line in lines)
+    while True:
+        chunk = list(islice(strings, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(machine_type, rules_file, lines, output, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+              step_limit=DEFAULT_STEP_LIMIT, ordered=True, detect_loops=False, pda_limits=None):
+    """
+    Classifies newline-delimited inputs with a process pool and writes one
+    JSON object per input to output. Each worker parses the rules file once.
+    At most 4 chunks per worker are in flight or waiting to be written, so
+    memory stays bounded regardless of input size. With ordered=False
+    results are written as soon as their chunk finishes. pda_limits is an
+    optional (max_stack_depth, max_configurations) pair passed to
+    PDA.set_limits.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    def write(strings, results, first_index):
+        for offset, (string, result) in enumerate(zip(strings, results)):
+            output.write(json.dumps(
+                {"index": first_index + offset, "input": string, "result": result}) + "\n")
+
+    if workers == 1:
+        machine = _load_machine(machine_type, rules_file, pda_limits)
+        index = 0
+        for chunk in _read_chunks(lines, chunk_size):
+            write(chunk, run_chunk(machine, machine_type, chunk, step_limit, detect_loops), index)
+            index += len(chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(machine_type, rules_file, step_limit, detect_loops, pda_limits)) as pool:
+        pending = {}
+
+        def collect(future):
+            strings, start = pending.pop(future)
+            _, results = future.result()
+            write(strings, results, start)
+
+        def collect_next():
+            if ordered:
+                # Waiting on the oldest chunk keeps output in input order
+                # without holding finished chunks back in memory.
+                collect(next(iter(pending)))
+            else:
+                collect(next(as_completed(pending)))
+
+        first_index = 0
+        for chunk_index, chunk in enumerate(_read_chunks(lines, chunk_size)):
+            future = pool.submit(_run_worker_chunk, chunk_index, chunk)
+            pending[future] = (chunk, first_index)
+            first_index += len(chunk)
+            if len(pending) >= 4 * workers:
+                collect_next()
+
+        while pending:
+            collect_next()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run newline-delimited inputs through an emulator in parallel and print JSONL results.")
+    parser.add_argument('machine_type', choices=MACHINE_TYPES)
+    parser.add_argument('rules_file')
+    parser.add_argument('input_file', nargs='?', default='-',
+                        help="file with one input string per line (default: stdin)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="inputs sent to a worker at a time")
+    parser.add_argument('--step-limit', type=int, default=DEFAULT_STEP_LIMIT,
+                        help="per-string step limit for Turing machines")
+    parser.add_argument('--detect-loops', action='store_true',
+                        help="report Turing machines that provably never halt as Looping")
+    parser.add_argument('--max-stack-depth', type=int, default=None,
+                        help="PDA stack depth cap; inputs that hit it are reported as Undecided")
+    parser.add_argument('--max-configurations', type=int, default=None,
+                        help="cap on live PDA configurations per input position")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as soon as they are ready")
+    args = parser.parse_args(argv)
+
+    # Parse in the parent first so a broken rules file fails fast.
+    parse_machine(args.machine_type, args.rules_file)
+
+    pda_limits = None
+    if args.max_stack_depth is not None or args.max_configurations is not None:
+        pda_limits = (args.max_stack_depth, args.max_configurations)
+
+    lines = sys.stdin if args.input_file == '-' else open(args.input_file)
+    try:
+        run_batch(args.machine_type, args.rules_file, lines, sys.stdout, args.workers,
+                  args.chunk_size, args.step_limit, not args.unordered, args.detect_loops, pda_limits)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
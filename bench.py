@@ -0,0 +1,413 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dfa import DFA
+from nfa import EPSILON, NFA
+from parallel import simulate_file_parallel
+from pda import PDA
+from rules_cache import MACHINE_TYPES, parse_machine
+from tm import TuringMachine
+
+DEFAULT_MAX_SIZE = 10 ** 7
+DEFAULT_MIN_TIME = 0.5
+DEFAULT_MAX_RUNS = 100
+MIN_RUNS = 3
+
+# The simulation methods timed for each machine type.
+ENGINES = {
+    'dfa': ('simulate',),
+    'nfa': ('simulate', 'simulate_bitset', 'simulate_lazy'),
+    'pda': ('simulate',),
+    'tm': ('simulate', 'simulate_compiled', 'simulate_accelerated'),
+}
+
+# Largest input length worth running per machine type; the Turing machine
+# on 0^n1^n2^n takes quadratically many steps, and the synthetic NFA and
+# PDA keep thousands of states or configurations active.
+SIZE_LIMITS = {
+    'dfa': 10 ** 7,
+    'nfa': 10 ** 7,
+    'pda': 10 ** 6,
+    'tm': 10 ** 3,
+}
+SYNTHETIC_SIZE_LIMITS = {
+    'dfa': 10 ** 6,
+    'nfa': 10 ** 4,
+    'pda': 10 ** 3,
+    'tm': 10 ** 4,
+}
+
+# Random Turing machines often never halt, so they run for a fixed budget.
+SYNTHETIC_STEP_LIMIT = 10 ** 5
+
+# DFA sizes and alphabet for the chunk-parallel scaling benchmark.
+PARALLEL_STATE_COUNTS = (16, 256, 4096)
+PARALLEL_SYMBOLS = 16
+
+SYMBOLS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+# --- Workloads ---
+
+def random_strings(alphabet):
+    alphabet = sorted(alphabet)
+
+    def generate(size, rng):
+        return "".join(rng.choices(alphabet, k=size))
+    return generate
+
+
+def balanced_zeros_ones(size, rng):
+    """0^n1^n, with n chosen so the string has the given length."""
+    half = size // 2
+    return "0" * half + "1" * half
+
+
+def zeros_ones_twos(size, rng):
+    """0^n1^n2^n, with n chosen so the string has about the given length."""
+    third = max(size // 3, 1)
+    return "0" * third + "1" * third + "2" * third
+
+
+# Rules files shipped with the repo, with the workload that exercises them.
+SHIPPED_MACHINES = {
+    'dfa': ('dfa_rules.fa', 'random', None),
+    'nfa': ('nfa_rules.fa', 'random', None),
+    'pda': ('pda_rules.fa', '0^n1^n', balanced_zeros_ones),
+    'tm': ('tm_rules.fa', '0^n1^n2^n', zeros_ones_twos),
+}
+
+
+# --- Synthetic machines ---
+
+def random_dfa(num_states, num_symbols, rng):
+    """A complete DFA with random transitions and about a third of its states final."""
+    states = [f"s{i}" for i in range(num_states)]
+    alphabet = list(SYMBOLS[:num_symbols])
+    transitions = {(state, symbol): rng.choice(states)
+                   for state in states for symbol in alphabet}
+    final_states = [s for s in states if rng.random() < 1 / 3]
+    return DFA(states, alphabet, transitions, states[0], final_states)
+
+
+def random_nfa(num_states, num_symbols, branching, epsilon_ratio, rng):
+    """
+    An NFA where every (state, symbol) pair has up to branching successors
+    and about epsilon_ratio of the states have an epsilon move.
+    """
+    states = [f"s{i}" for i in range(num_states)]
+    alphabet = list(SYMBOLS[:num_symbols])
+    transitions = {}
+    for state in states:
+        for symbol in alphabet:
+            transitions[(state, symbol)] = set(rng.sample(states, rng.randint(0, branching)))
+        if rng.random() < epsilon_ratio:
+            transitions[(state, EPSILON)] = {rng.choice(states)}
+    final_states = [s for s in states if rng.random() < 0.1]
+    return NFA(states, alphabet, transitions, states[0], final_states)
+
+
+def random_pda(num_states, num_symbols, branching, rng):
+    """
+    A nondeterministic one-counter PDA: the stack holds A's above the bottom
+    marker Z, and every move pops, keeps or pushes one A. The number of
+    configurations therefore grows at most linearly with the input, where a
+    random PDA over a larger stack alphabet would grow exponentially.
+    """
+    states = [f"s{i}" for i in range(num_states)]
+    alphabet = list(SYMBOLS[:num_symbols])
+    transitions = {}
+    for state in states:
+        for symbol in alphabet:
+            for top, pushes in (("Z", ("Z", "AZ")), ("A", ("", "A", "AA"))):
+                transitions[(state, symbol, top)] = {
+                    (rng.choice(states), rng.choice(pushes)) for _ in range(rng.randint(1, branching))}
+        if rng.random() < 0.2:
+            transitions[(state, EPSILON, "A")] = {(rng.choice(states), "")}
+    final_states = [s for s in states if rng.random() < 0.2]
+    return PDA(states, alphabet, ["Z", "A"], transitions, states[0], "Z", final_states)
+
+
+def random_tm(num_states, num_symbols, rng):
+    """A Turing machine with random transitions; about 5% of them halt."""
+    states = [f"s{i}" for i in range(num_states)]
+    alphabet = list(SYMBOLS[:num_symbols])
+    tape_alphabet = alphabet + ["_"]
+    transitions = {}
+    for state in states:
+        for symbol in tape_alphabet:
+            roll = rng.random()
+            if roll < 0.025:
+                next_state = "accept"
+            elif roll < 0.05:
+                next_state = "reject"
+            else:
+                next_state = rng.choice(states)
+            transitions[(state, symbol)] = (next_state, rng.choice(tape_alphabet), rng.choice("LR"))
+    return TuringMachine(states + ["accept", "reject"], alphabet, tape_alphabet, transitions,
+                         states[0], "accept", "reject", "_")
+
+
+def synthetic_machines(rng):
+    """Yields (name, machine_type, machine, alphabet) for each synthetic machine."""
+    yield 'random-dfa-2000x62', 'dfa', random_dfa(2000, 62, rng), SYMBOLS[:62]
+    yield 'random-nfa-200x16-b3', 'nfa', random_nfa(200, 16, 3, 0.1, rng), SYMBOLS[:16]
+    yield 'random-pda-8x4-b2', 'pda', random_pda(8, 4, 2, rng), SYMBOLS[:4]
+    yield 'random-tm-200x8', 'tm', random_tm(200, 8, rng), SYMBOLS[:8]
+
+
+# --- Measurement ---
+
+def _percentile(sorted_values, fraction):
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(call, inputs, min_time=DEFAULT_MIN_TIME, max_runs=DEFAULT_MAX_RUNS, memory=True):
+    """
+    Times call on the given inputs, cycling through them until min_time has
+    passed (at least MIN_RUNS and at most max_runs calls). Peak memory is
+    measured on a separate, untimed call, since tracemalloc slows the
+    interpreter down.
+    """
+    latencies = []
+    symbols = 0
+    started = time.perf_counter()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(latencies) < max_runs and \
+                (len(latencies) < MIN_RUNS or time.perf_counter() - started < min_time):
+            string = inputs[len(latencies) % len(inputs)]
+            begin = time.perf_counter()
+            call(string)
+            latencies.append(time.perf_counter() - begin)
+            symbols += len(string)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    total = sum(latencies)
+    latencies.sort()
+    result = {
+        "runs": len(latencies),
+        "calls_per_second": len(latencies) / total if total > 0 else None,
+        "symbols_per_second": symbols / total if total > 0 else None,
+        "latency_ms": {
+            "min": 1000 * latencies[0],
+            "p50": 1000 * _percentile(latencies, 0.5),
+            "p90": 1000 * _percentile(latencies, 0.9),
+            "p99": 1000 * _percentile(latencies, 0.99),
+            "max": 1000 * latencies[-1],
+        },
+        "peak_memory_bytes": None,
+    }
+
+    if memory:
+        tracemalloc.start()
+        try:
+            call(inputs[0])
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def sizes_up_to(limit):
+    sizes = []
+    size = 10
+    while size <= limit:
+        sizes.append(size)
+        size *= 10
+    return sizes
+
+
+def _engine_call(machine, machine_type, engine, step_limit):
+    method = getattr(machine, engine)
+    if machine_type == 'tm':
+        return lambda string: method(string, step_limit)
+    return method
+
+
+def bench_machine(name, machine_type, machine, workload, generate, max_size, rng, options, report,
+                  step_limit=None):
+    """
+    Benchmarks every engine of one machine at each size up to max_size. All
+    engines see the same inputs. Turing machines get step_limit steps, or by
+    default enough for a quadratic-time machine to finish.
+    """
+    inputs = {}
+    for size in sizes_up_to(max_size):
+        # Several random inputs for short strings; one is enough once a
+        # single call takes long enough to time on its own.
+        count = 1 if workload != 'random' or size >= 10 ** 4 else 16
+        inputs[size] = [generate(size, rng) for _ in range(count)]
+
+    for engine in ENGINES[machine_type]:
+        for size, strings in inputs.items():
+            limit = step_limit if step_limit is not None else 10 * size * size + 1000
+            call = _engine_call(machine, machine_type, engine, limit)
+            result = measure(call, strings, options.min_time, options.max_runs, not options.no_memory)
+            result.update({"machine": name, "type": machine_type, "engine": engine,
+                           "workload": workload, "size": size})
+            report(result)
+
+
+def _worker_counts():
+    counts = []
+    workers = 1
+    while workers < (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+
+def bench_parallel(options, rng, report):
+    """
+    Times parallel.simulate_file_parallel on one random input file of
+    max_size bytes, for random DFAs of each size in PARALLEL_STATE_COUNTS
+    and for 1, 2, 4, ... worker processes up to the CPU count. speedup is
+    relative to one worker. Peak memory is not measured, since most of the
+    work happens in other processes.
+    """
+    size = options.max_size
+    generate = random_strings(SYMBOLS[:PARALLEL_SYMBOLS])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input.txt")
+        with open(path, 'w') as f:
+            for start in range(0, size, 1 << 20):
+                f.write(generate(min(1 << 20, size - start), rng))
+
+        for num_states in PARALLEL_STATE_COUNTS:
+            dfa = random_dfa(num_states, PARALLEL_SYMBOLS, rng)
+            single = None
+            for workers in _worker_counts():
+                result = measure(lambda p: simulate_file_parallel(dfa, p, workers), [path],
+                                 options.min_time, options.max_runs, memory=False)
+                # measure counts the path as the input; the file is what was read.
+                result["symbols_per_second"] = size * result["calls_per_second"]
+                single = single or result["symbols_per_second"]
+                result.update({"machine": f"random-dfa-{num_states}x{PARALLEL_SYMBOLS}", "type": 'dfa',
+                               "engine": f"parallel-w{workers}", "workload": 'file', "size": size,
+                               "workers": workers, "speedup": result["symbols_per_second"] / single})
+                report(result)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_result(result, baseline):
+    line = (f"{result['machine']:<24} {result['engine']:<20} {result['size']:>9} "
+            f"{result['symbols_per_second'] or 0:>14,.0f} sym/s  "
+            f"p50 {result['latency_ms']['p50']:>10.3f} ms  p99 {result['latency_ms']['p99']:>10.3f} ms")
+    if result['peak_memory_bytes'] is not None:
+        line += f"  peak {result['peak_memory_bytes'] / 1024:>10,.1f} KiB"
+    previous = baseline.get((result['machine'], result['engine'], result['size']))
+    if previous and previous.get('symbols_per_second') and result['symbols_per_second']:
+        line += f"  x{result['symbols_per_second'] / previous['symbols_per_second']:.2f} vs baseline"
+    print(line, flush=True)
+
+
+def run_benchmarks(options):
+    rng = random.Random(options.seed)
+    results = []
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline) as f:
+            for previous in json.load(f)["results"]:
+                baseline[(previous['machine'], previous['engine'], previous['size'])] = previous
+
+    def report(result):
+        results.append(result)
+        if not options.quiet:
+            _print_result(result, baseline)
+
+    if options.parallel:
+        bench_parallel(options, rng, report)
+        options.types = []
+
+    for machine_type in options.types:
+        rules_file, workload, generate = SHIPPED_MACHINES[machine_type]
+        machine = parse_machine(machine_type, rules_file)
+        if generate is None:
+            alphabet = machine.alphabet if machine_type in ('dfa', 'nfa') else machine.input_alphabet
+            generate = random_strings(alphabet)
+        bench_machine(rules_file, machine_type, machine, workload, generate,
+                      min(options.max_size, SIZE_LIMITS[machine_type]), rng, options, report)
+
+    if options.synthetic:
+        for name, machine_type, machine, alphabet in synthetic_machines(rng):
+            if machine_type in options.types:
+                bench_machine(name, machine_type, machine, 'random', random_strings(alphabet),
+                              min(options.max_size, SYNTHETIC_SIZE_LIMITS[machine_type]),
+                              rng, options, report, SYNTHETIC_STEP_LIMIT)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": options.seed,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the emulators on the shipped rules files and on synthetic machines.")
+    parser.add_argument('types', nargs='*', metavar='type',
+                        help=f"machine types to benchmark, from {', '.join(MACHINE_TYPES)} (default: all)")
+    parser.add_argument('-o', '--output', help="write JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results from an earlier run to compare throughput against")
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE,
+                        help="largest input length (each type also has its own limit)")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="also benchmark large random machines")
+    parser.add_argument('--parallel', action='store_true',
+                        help="only benchmark chunk-parallel DFA simulation of one max-size file, "
+                             "across worker counts and DFA sizes")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help="seconds to spend timing each case")
+    parser.add_argument('--max-runs', type=int, default=DEFAULT_MAX_RUNS,
+                        help="most calls timed per case")
+    parser.add_argument('--no-memory', action='store_true', help="skip peak memory measurement")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-q', '--quiet', action='store_true')
+    options = parser.parse_args(argv)
+    options.types = list(dict.fromkeys(options.types or MACHINE_TYPES))
+    for machine_type in options.types:
+        if machine_type not in MACHINE_TYPES:
+            parser.error(f"unknown machine type '{machine_type}', expected one of {MACHINE_TYPES}")
+
+    report = run_benchmarks(options)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
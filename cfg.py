@@ -0,0 +1,208 @@
+import sys
+from collections import deque
+from pda import EPSILON, parse_pda_json
+
+
+class _Marker:
+    """A stack symbol or state that cannot clash with names from a rules file."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+BOTTOM = _Marker("<bottom>")
+NEW_START = _Marker("<start>")
+DRAIN = _Marker("<drain>")
+START_SYMBOL = ("S",)
+
+
+class Grammar:
+    """
+    A context-free grammar. Terminals are input symbols (strings) and
+    nonterminals are tuples, so the two can never be confused.
+    """
+
+    def __init__(self, start, productions):
+        self.start = start
+        self.productions = productions
+        self.by_lhs = {}
+        for index, (lhs, _) in enumerate(productions):
+            self.by_lhs.setdefault(lhs, []).append(index)
+        self.nullable = self._find_nullable()
+
+    def _find_nullable(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in self.productions:
+                if lhs not in nullable and all(symbol in nullable for symbol in rhs):
+                    nullable.add(lhs)
+                    changed = True
+        return nullable
+
+    def __len__(self):
+        return len(self.productions)
+
+
+def _augmented_transitions(pda):
+    """
+    Turns acceptance by final state into acceptance by empty stack: a new
+    bottom marker sits under the start symbol, and every final state may move
+    to a drain state that pops everything, marker included.
+    """
+    transitions = {key: set(moves) for key, moves in pda.transitions.items()}
+    stack_symbols = set(pda.stack_alphabet) | {BOTTOM}
+
+    transitions[(NEW_START, EPSILON, BOTTOM)] = {
+        (pda.start_state, (pda.start_stack_symbol, BOTTOM))}
+    for state in list(pda.final_states) + [DRAIN]:
+        for symbol in stack_symbols:
+            transitions.setdefault((state, EPSILON, symbol), set()).add((DRAIN, ()))
+    return transitions
+
+
+def pda_to_cfg(pda):
+    """
+    Converts a PDA into an equivalent context-free grammar with the triple
+    construction. Nonterminal ("T", p, X, r) derives exactly the inputs that
+    take the PDA from state p with X on top of the stack to state r with
+    that X popped. Long pushes are split through ("Q", q, symbols, r)
+    nonterminals so the grammar stays polynomial in the number of states.
+    Only nonterminals reachable from the start symbol are generated.
+    """
+    transitions = _augmented_transitions(pda)
+    states = list(pda.states) + [NEW_START, DRAIN]
+
+    moves_from = {}
+    for (state, inp, top), moves in transitions.items():
+        for next_state, push in moves:
+            moves_from.setdefault((state, top), []).append((inp, next_state, tuple(push)))
+
+    productions = []
+    seen = {START_SYMBOL}
+    queue = deque([START_SYMBOL])
+
+    def use(symbol):
+        if isinstance(symbol, tuple) and symbol not in seen:
+            seen.add(symbol)
+            queue.append(symbol)
+        return symbol
+
+    def sequence(state, push, end):
+        if len(push) == 1:
+            return use(("T", state, push[0], end))
+        return use(("Q", state, push, end))
+
+    while queue:
+        nonterminal = queue.popleft()
+        kind = nonterminal[0]
+
+        if kind == "S":
+            for end in states:
+                productions.append(
+                    (nonterminal, (use(("T", NEW_START, BOTTOM, end)),)))
+
+        elif kind == "T":
+            _, state, top, end = nonterminal
+            for inp, next_state, push in moves_from.get((state, top), ()):
+                prefix = (inp,) if inp != EPSILON else ()
+                if not push:
+                    if next_state == end:
+                        productions.append((nonterminal, prefix))
+                else:
+                    productions.append(
+                        (nonterminal, prefix + (sequence(next_state, push, end),)))
+
+        else:
+            _, state, push, end = nonterminal
+            for middle in states:
+                productions.append((nonterminal, (
+                    use(("T", state, push[0], middle)),
+                    sequence(middle, push[1:], end))))
+
+    return Grammar(START_SYMBOL, productions)
+
+
+def earley_recognize(grammar, tokens):
+    """
+    Decides whether the grammar derives the token sequence with an Earley
+    parser, in O(n^3) time in the worst case and O(n^2) for unambiguous
+    grammars. Empty productions are handled as described by Aycock and
+    Horspool: predicting a nullable nonterminal also steps over it.
+    """
+    productions = grammar.productions
+    by_lhs = grammar.by_lhs
+    nullable = grammar.nullable
+    n = len(tokens)
+
+    def add(chart, seen, waiting, item):
+        if item in seen:
+            return
+        seen.add(item)
+        chart.append(item)
+        production, dot, _ = item
+        rhs = productions[production][1]
+        if dot < len(rhs):
+            waiting.setdefault(rhs[dot], []).append(item)
+
+    charts = [[] for _ in range(n + 1)]
+    seens = [set() for _ in range(n + 1)]
+    waitings = [{} for _ in range(n + 1)]
+    for production in by_lhs.get(grammar.start, ()):
+        add(charts[0], seens[0], waitings[0], (production, 0, 0))
+
+    for i in range(n + 1):
+        chart, seen, waiting = charts[i], seens[i], waitings[i]
+        j = 0
+        while j < len(chart):
+            production, dot, origin = chart[j]
+            j += 1
+            lhs, rhs = productions[production]
+
+            if dot == len(rhs):
+                for p2, d2, o2 in list(waitings[origin].get(lhs, ())):
+                    add(chart, seen, waiting, (p2, d2 + 1, o2))
+                continue
+
+            symbol = rhs[dot]
+            if isinstance(symbol, tuple):
+                for predicted in by_lhs.get(symbol, ()):
+                    add(chart, seen, waiting, (predicted, 0, i))
+                if symbol in nullable:
+                    add(chart, seen, waiting, (production, dot + 1, origin))
+            elif i < n and tokens[i] == symbol:
+                add(charts[i + 1], seens[i + 1], waitings[i + 1],
+                    (production, dot + 1, origin))
+
+        if i < n and not charts[i + 1]:
+            return False
+
+    for production, dot, origin in charts[n]:
+        lhs, rhs = productions[production]
+        if lhs == grammar.start and dot == len(rhs) and origin == 0:
+            return True
+    return False
+
+
+if __name__ == '__main__':
+    try:
+        if len(sys.argv) >= 2:
+            rules_file = sys.argv[1]
+        else:
+            rules_file = input("Input your PDA rule filename: ")
+
+        grammar = pda_to_cfg(parse_pda_json(rules_file))
+        for lhs, rhs in grammar.productions:
+            print(f"{lhs} -> {' '.join(map(str, rhs)) if rhs else 'ε'}")
+        print(f"{len(grammar)} productions")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from dfa import DFA, parse_dfa_json
+from tm import INVALID_MOVE, NO_TRANSITION, CompiledTuringMachine, TuringMachine, parse_tm_json
+
+MAGIC = b"FAC\0"
+FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = ".compiled"
+MACHINE_KINDS = {'dfa': 1, 'tm': 2}
+ALIGNMENT = 8
+
+# magic, format version, machine kind, byte order, source sha256, metadata length
+HEADER = struct.Struct('<4sHBB32sI')
+BYTE_ORDERS = {'little': 0, 'big': 1}
+
+# What each machine kind's loader reads back from the metadata block.
+META_KEYS = {
+    'dfa': ("states", "alphabet", "start_state", "final_states", "state_names", "symbols",
+            "has_byte_classes"),
+    'tm': ("states", "input_alphabet", "tape_alphabet", "start_state", "accept_state",
+           "reject_state", "blank_symbol", "state_names", "symbols", "invalid_transitions"),
+}
+ARRAY_NAMES = {
+    'dfa': ("table", "accepting", "byte_classes"),
+    'tm': ("next_states", "writes", "deltas"),
+}
+
+
+def artifact_path(rules_path):
+    return rules_path + ARTIFACT_SUFFIX
+
+
+def source_hash(rules_path):
+    with open(rules_path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+class TableTransitions(Mapping):
+    """
+    Read-only (state, symbol) -> next state view over a compiled DFA table,
+    so a DFA loaded from an artifact never needs its transition dict built.
+    """
+
+    def __init__(self, dfa):
+        self._dfa = dfa
+        self._length = None
+
+    def __getitem__(self, key):
+        state, symbol = key
+        dfa = self._dfa
+        if state not in dfa.state_ids or symbol not in dfa.symbol_ids:
+            raise KeyError(key)
+        next_offset = dfa.table[dfa.state_ids[state] * dfa.width + dfa.symbol_ids[symbol]]
+        if next_offset < 0:
+            raise KeyError(key)
+        return dfa.state_names[next_offset // dfa.width]
+
+    def __iter__(self):
+        dfa = self._dfa
+        symbols = sorted(dfa.symbol_ids, key=dfa.symbol_ids.get)
+        for state_id, state in enumerate(dfa.state_names):
+            offset = state_id * dfa.width
+            for symbol_id, symbol in enumerate(symbols):
+                if dfa.table[offset + symbol_id] >= 0:
+                    yield (state, symbol)
+
+    def __len__(self):
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
+
+
+class TuringTransitions(Mapping):
+    """Read-only (state, read) -> (next_state, write, move) view over a CompiledTuringMachine."""
+
+    def __init__(self, compiled, invalid_transitions):
+        self._compiled = compiled
+        self._invalid = invalid_transitions
+        self._length = None
+
+    def __getitem__(self, key):
+        state, read = key
+        compiled = self._compiled
+        if state not in compiled.state_ids or read not in compiled.symbol_ids:
+            raise KeyError(key)
+        i = compiled.state_ids[state] * compiled.width + compiled.symbol_ids[read]
+        next_state = compiled.next_states[i]
+        if next_state == INVALID_MOVE:
+            return self._invalid[i]
+        if next_state < 0:
+            raise KeyError(key)
+        move = 'R' if compiled.deltas[i] > 0 else 'L'
+        return (compiled.state_names[next_state], compiled.symbols[compiled.writes[i]], move)
+
+    def __iter__(self):
+        compiled = self._compiled
+        for state_id, state in enumerate(compiled.state_names):
+            for symbol_id, symbol in enumerate(compiled.symbols):
+                if compiled.next_states[state_id * compiled.width + symbol_id] != NO_TRANSITION:
+                    yield (state, symbol)
+
+    def __len__(self):
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
+
+
+def _dfa_sections(dfa):
+    meta = {
+        "states": sorted(dfa.states),
+        "alphabet": sorted(dfa.alphabet),
+        "start_state": dfa.start_state,
+        "final_states": sorted(dfa.final_states),
+        "state_names": dfa.state_names,
+        "symbols": sorted(dfa.symbol_ids, key=dfa.symbol_ids.get),
+        "has_byte_classes": dfa.byte_classes is not None,
+    }
+    arrays = {
+        "table": array('i', dfa.table),
+        "accepting": array('B', dfa.accepting),
+        "byte_classes": array('B', dfa.byte_classes or b""),
+    }
+    return meta, arrays
+
+
+def _tm_sections(tm):
+    compiled = tm.compile()
+    meta = {
+        "states": sorted(tm.states),
+        "input_alphabet": sorted(tm.input_alphabet),
+        "tape_alphabet": sorted(tm.tape_alphabet),
+        "start_state": tm.start_state,
+        "accept_state": tm.accept_state,
+        "reject_state": tm.reject_state,
+        "blank_symbol": tm.blank_symbol,
+        "state_names": compiled.state_names,
+        "symbols": compiled.symbols,
+        "invalid_transitions": [
+            [i, list(tm.transitions[(compiled.state_names[i // compiled.width],
+                                     compiled.symbols[i % compiled.width])])]
+            for i in compiled.invalid_moves],
+    }
+    arrays = {
+        "next_states": compiled.next_states,
+        "writes": compiled.writes,
+        "deltas": compiled.deltas,
+    }
+    return meta, arrays
+
+
+def write_artifact(machine_type, rules_path, machine=None):
+    """
+    Writes the compiled artifact for a rules file and returns its path.
+    Layout: a fixed header (magic, format version, machine kind, byte order,
+    SHA-256 of the source .fa, metadata length), a JSON metadata block with
+    the interned state and symbol tables and the offset of every array, then
+    the raw transition arrays, each aligned to 8 bytes.
+    """
+    if machine_type not in MACHINE_KINDS:
+        raise ValueError(
+            f"Compiled artifacts are only supported for {sorted(MACHINE_KINDS)}, not '{machine_type}'")
+
+    digest = source_hash(rules_path)
+    if machine is None:
+        machine = parse_dfa_json(rules_path) if machine_type == 'dfa' else parse_tm_json(rules_path)
+    meta, arrays = _dfa_sections(machine) if machine_type == 'dfa' else _tm_sections(machine)
+
+    # Array offsets are relative to the first aligned byte after the metadata.
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = [offset, len(values), values.typecode]
+        offset += len(values) * values.itemsize
+        offset += -offset % ALIGNMENT
+    meta["arrays"] = layout
+    meta_bytes = json.dumps(meta).encode('utf-8')
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, MACHINE_KINDS[machine_type],
+                         BYTE_ORDERS[sys.byteorder], digest, len(meta_bytes))
+    path = artifact_path(rules_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            f.write(meta_bytes)
+            f.write(b"\0" * (-(HEADER.size + len(meta_bytes)) % ALIGNMENT))
+            for name, values in arrays.items():
+                data = values.tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % ALIGNMENT))
+        # Readers never see a half-written artifact.
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def _open_artifact(machine_type, rules_path):
+    """
+    Maps the artifact for rules_path and returns (mapping, meta, arrays), or
+    None when it is missing, from another format version or byte order,
+    stale because the source .fa changed, or truncated or corrupt.
+    """
+    path = artifact_path(rules_path)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return None
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magic, version, kind, byte_order, digest, meta_length = HEADER.unpack_from(mapping, 0)
+        if (magic != MAGIC or version != FORMAT_VERSION
+                or kind != MACHINE_KINDS[machine_type]
+                or byte_order != BYTE_ORDERS[sys.byteorder]
+                or digest != source_hash(rules_path)):
+            sections = None
+        else:
+            sections = _read_sections(machine_type, mapping, meta_length)
+    except (ValueError, KeyError, TypeError, struct.error):
+        # json.JSONDecodeError and UnicodeDecodeError are ValueErrors.
+        sections = None
+    if sections is None:
+        mapping.close()
+        return None
+    return (mapping,) + sections
+
+
+def _read_sections(machine_type, mapping, meta_length):
+    """
+    Parses the metadata block and views every array in place. Returns
+    (meta, arrays), or None when a key is missing or an array would run past
+    the end of the mapping. No view is taken until every array is checked,
+    so the caller can still close the mapping.
+    """
+    meta_end = HEADER.size + meta_length
+    if meta_end > len(mapping):
+        return None
+    meta = json.loads(bytes(mapping[HEADER.size:meta_end]).decode('utf-8'))
+    if any(key not in meta for key in META_KEYS[machine_type]):
+        return None
+    base = meta_end + (-meta_end % ALIGNMENT)
+
+    bounds = {}
+    for name in ARRAY_NAMES[machine_type]:
+        offset, length, typecode = meta["arrays"][name]
+        start = base + offset
+        end = start + length * array(typecode).itemsize
+        if offset < 0 or length < 0 or end > len(mapping):
+            return None
+        bounds[name] = (start, end, typecode)
+
+    view = memoryview(mapping)
+    arrays = {name: view[start:end].cast(typecode) for name, (start, end, typecode) in bounds.items()}
+    return meta, arrays
+
+
+def _dfa_from_artifact(mapping, meta, arrays):
+    dfa = DFA.__new__(DFA)
+    dfa.states = set(meta["states"])
+    dfa.alphabet = set(meta["alphabet"])
+    dfa.start_state = meta["start_state"]
+    dfa.final_states = set(meta["final_states"])
+
+    dfa.state_names = meta["state_names"]
+    dfa.state_ids = {s: i for i, s in enumerate(dfa.state_names)}
+    dfa.symbol_ids = {a: i for i, a in enumerate(meta["symbols"])}
+    dfa.width = len(dfa.symbol_ids) + 1
+    dfa.other_class = len(dfa.symbol_ids)
+    dfa.table = arrays["table"]
+    dfa.accepting = arrays["accepting"]
+    dfa.byte_classes = arrays["byte_classes"] if meta["has_byte_classes"] else None
+    dfa.start_offset = 0
+    dfa._np_table = None
+    dfa.transitions = TableTransitions(dfa)
+    dfa._mapping = mapping
+    return dfa
+
+
+def _tm_from_artifact(mapping, meta, arrays):
+    compiled = CompiledTuringMachine.__new__(CompiledTuringMachine)
+    compiled.symbols = meta["symbols"]
+    compiled.symbol_ids = {s: i for i, s in enumerate(compiled.symbols)}
+    compiled.state_names = meta["state_names"]
+    compiled.state_ids = {s: i for i, s in enumerate(compiled.state_names)}
+    compiled.accept_id = compiled.state_ids[meta["accept_state"]]
+    compiled.reject_id = compiled.state_ids[meta["reject_state"]]
+    compiled.halt_base = min(compiled.accept_id, compiled.reject_id)
+    compiled.width = len(compiled.symbols)
+    compiled.next_states = arrays["next_states"]
+    compiled.writes = arrays["writes"]
+    compiled.deltas = arrays["deltas"]
+    invalid = {i: tuple(t) for i, t in meta["invalid_transitions"]}
+    compiled.invalid_moves = {i: t[2] for i, t in invalid.items()}
+    compiled.tape = bytearray()
+    compiled.origin = 0
+    compiled.head_position = 0
+    compiled.current_state = meta["start_state"]
+    compiled.steps = 0
+
+    tm = TuringMachine(meta["states"], meta["input_alphabet"], meta["tape_alphabet"],
+                       TuringTransitions(compiled, invalid), meta["start_state"],
+                       meta["accept_state"], meta["reject_state"], meta["blank_symbol"])
+    compiled.tm = tm
+    tm._compiled = compiled
+    tm._mapping = mapping
+    return tm
+
+
+def load_compiled(machine_type, rules_path):
+    """
+    Returns the machine for a rules file, memory-mapping its compiled
+    artifact when one exists for the current contents of the .fa file.
+    Otherwise the .fa file is parsed, and a fresh artifact is written for
+    the next load.
+    """
+    if machine_type not in MACHINE_KINDS:
+        raise ValueError(
+            f"Compiled artifacts are only supported for {sorted(MACHINE_KINDS)}, not '{machine_type}'")
+
+    opened = _open_artifact(machine_type, rules_path)
+    if opened is not None:
+        if machine_type == 'dfa':
+            return _dfa_from_artifact(*opened)
+        return _tm_from_artifact(*opened)
+
+    machine = parse_dfa_json(rules_path) if machine_type == 'dfa' else parse_tm_json(rules_path)
+    write_artifact(machine_type, rules_path, machine)
+    return machine
+
+
+if __name__ == '__main__':
+    try:
+        if len(sys.argv) >= 3:
+            machine_type = sys.argv[1].lower()
+            rules_file = sys.argv[2]
+        else:
+            machine_type = input("Input the machine type (dfa, tm): ").lower()
+            rules_file = input("Input your rule filename: ")
+
+        path = write_artifact(machine_type, rules_file)
+        print(f"Compiled {machine_type.upper()} rules written to: {path}")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
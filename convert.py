@@ -0,0 +1,101 @@
+import sys
+from collections import deque
+from dfa import DFA, minimize_dfa, write_dfa_json
+from nfa import EPSILON, parse_nfa_json
+
+
+def _state_set_name(state_set):
+    return "{" + ",".join(sorted(state_set)) + "}"
+
+
+def epsilon_closures(nfa):
+    """
+    Computes the epsilon closure of every NFA state once, so subset
+    construction only has to union precomputed sets.
+    """
+    states = set(nfa.states) | {nfa.start_state}
+    for (curr, _), next_states in nfa.transitions.items():
+        states.add(curr)
+        states.update(next_states)
+    return {state: frozenset(nfa._get_epsilon_closure({state})) for state in states}
+
+
+def nfa_to_dfa(nfa):
+    """
+    Converts an NFA (epsilon transitions included) to an equivalent DFA using
+    the subset construction. Each DFA state is named after the set of NFA
+    states it stands for, e.g. "{q0,q1}". The empty set is not materialized:
+    missing transitions reject, exactly as in parse_dfa_json output.
+    """
+    closures = epsilon_closures(nfa)
+
+    # NFA.simulate does not check the alphabet, so every symbol that appears
+    # on a transition has to stay usable in the DFA.
+    alphabet = {symbol for (_, symbol) in nfa.transitions if symbol != EPSILON}
+    alphabet |= set(nfa.alphabet) - {EPSILON}
+    symbols = sorted(alphabet)
+
+    start = closures[nfa.start_state]
+    names = {start: _state_set_name(start)}
+    transitions = {}
+    queue = deque([start])
+
+    while queue:
+        current = queue.popleft()
+        for symbol in symbols:
+            target = set()
+            for state in current:
+                for next_state in nfa.transitions.get((state, symbol), ()):
+                    target |= closures[next_state]
+            if not target:
+                continue
+            target = frozenset(target)
+            if target not in names:
+                names[target] = _state_set_name(target)
+                queue.append(target)
+            transitions[(names[current], symbol)] = names[target]
+
+    final_states = [name for subset, name in names.items()
+                    if not subset.isdisjoint(nfa.final_states)]
+    return DFA(names.values(), alphabet, transitions, names[start], final_states)
+
+
+def nfa_to_minimal_dfa(nfa):
+    """
+    Determinizes and then minimizes an NFA. Returns the DFA together with the
+    state counts at each stage so that subset-construction blowup is visible.
+    """
+    dfa = nfa_to_dfa(nfa)
+    minimal = minimize_dfa(dfa)
+    stats = {
+        "nfa_states": len(nfa.states),
+        "dfa_states": len(dfa.states),
+        "minimal_dfa_states": len(minimal.states),
+    }
+    return minimal, stats
+
+
+if __name__ == '__main__':
+    try:
+        if len(sys.argv) >= 3:
+            rules_file = sys.argv[1]
+            output_file = sys.argv[2]
+        else:
+            rules_file = input("Input your NFA rule filename: ")
+            output_file = input("Input the DFA output filename: ")
+
+        nfa = parse_nfa_json(rules_file)
+        dfa, stats = nfa_to_minimal_dfa(nfa)
+        write_dfa_json(dfa, output_file)
+
+        print(f"NFA states: {stats['nfa_states']}")
+        print(f"DFA states after subset construction: {stats['dfa_states']}")
+        print(f"DFA states after minimization: {stats['minimal_dfa_states']}")
+        print(f"Minimal DFA written to: {output_file}")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
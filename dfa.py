@@ -1,5 +1,15 @@
 import sys
+import json
+from array import array
 from read_file import *
+from scan import LEFTMOST_LONGEST, scan_threads
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEAD_STATE = -1
 
 
 class DFA:
@@ -9,8 +19,216 @@ class DFA:
         self.transitions = transitions
         self.start_state = start_state
         self.final_states = set(final_states)
+        self.compile()
+
+    def compile(self):
+        """
+        Interns states and alphabet symbols to dense integers and lays the
+        transitions out in a flat array, one row per state and one column per
+        symbol. An extra trailing column catches every symbol outside the
+        alphabet, so it always leads to DEAD_STATE.
+
+        Table entries hold the row offset of the next state (state_id * width)
+        rather than the id itself, which saves a multiplication per symbol.
+        """
+        state_names = [self.start_state]
+        seen = {self.start_state}
+        for (curr, _), next_state in self.transitions.items():
+            for state in (curr, next_state):
+                if state not in seen:
+                    seen.add(state)
+                    state_names.append(state)
+        for state in sorted(self.states - seen):
+            state_names.append(state)
+
+        # Only single-character symbols can ever match, since input is read
+        # one character at a time.
+        symbols = sorted(a for a in self.alphabet if len(a) == 1)
+
+        self.state_names = state_names
+        self.state_ids = {s: i for i, s in enumerate(state_names)}
+        self.symbol_ids = {a: i for i, a in enumerate(symbols)}
+        self.width = len(symbols) + 1
+        self.other_class = len(symbols)
+
+        table = array('i', [DEAD_STATE]) * (len(state_names) * self.width)
+        for (curr, symbol), next_state in self.transitions.items():
+            if symbol in self.symbol_ids:
+                offset = self.state_ids[curr] * self.width
+                table[offset + self.symbol_ids[symbol]] = \
+                    self.state_ids[next_state] * self.width
+        self.table = table
+
+        self.accepting = bytearray(len(table))
+        for state in self.final_states:
+            if state in self.state_ids:
+                self.accepting[self.state_ids[state] * self.width] = 1
+
+        # Byte-to-symbol-class map, usable whenever every symbol fits in a
+        # single latin-1 byte.
+        self.byte_classes = None
+        if all(ord(a) < 256 for a in symbols) and self.width <= 256:
+            byte_classes = bytearray([self.other_class]) * 256
+            for a, i in self.symbol_ids.items():
+                byte_classes[ord(a)] = i
+            self.byte_classes = bytes(byte_classes)
+
+        self.start_offset = 0
+        self._np_table = None
+        return self
+
+    def _classify(self, input_string):
+        """
+        Translates the input into a sequence of symbol classes.
+        Accepts both str and bytes; bytes are read as latin-1 characters.
+        """
+        if self.byte_classes is not None:
+            if isinstance(input_string, str):
+                try:
+                    input_string = input_string.encode('latin-1')
+                except UnicodeEncodeError:
+                    return None
+            return input_string.translate(self.byte_classes)
+
+        if isinstance(input_string, (bytes, bytearray, memoryview)):
+            input_string = bytes(input_string).decode('latin-1')
+        get = self.symbol_ids.get
+        other = self.other_class
+        return [get(symbol, other) for symbol in input_string]
 
     def simulate(self, input_string):
+        classes = self._classify(input_string)
+        if classes is None:
+            return False
+
+        table = self.table
+        state = self.start_offset
+        for symbol_class in classes:
+            state = table[state + symbol_class]
+            if state < 0:
+                return False
+        return self.accepting[state] == 1
+
+    def _batch_table(self):
+        """
+        Builds the NumPy form of the transition table used by simulate_many:
+        state ids instead of row offsets, an explicit dead row, and one extra
+        padding column that leaves every state unchanged.
+        """
+        if self._np_table is not None:
+            return self._np_table, self._np_accepting, self._np_classes
+
+        n = len(self.table) // self.width
+        dead = n
+        offsets = np.frombuffer(self.table, dtype=np.int32).reshape(n, self.width)
+        ids = np.where(offsets < 0, dead, offsets // self.width)
+
+        table = np.full((n + 1, self.width + 1), dead, dtype=np.int32)
+        table[:n, :self.width] = ids
+        table[:, self.width] = np.arange(n + 1)
+
+        accepting = np.zeros(n + 1, dtype=bool)
+        accepting[:n] = np.frombuffer(
+            bytes(self.accepting), dtype=np.uint8)[::self.width] == 1
+
+        self._np_table = table
+        self._np_accepting = accepting
+        self._np_classes = np.frombuffer(self.byte_classes, dtype=np.uint8)
+        return self._np_table, self._np_accepting, self._np_classes
+
+    def _simulate_chunk(self, chunk):
+        table, accepting, byte_classes = self._batch_table()
+        pad = self.width
+
+        encoded = []
+        valid = np.ones(len(chunk), dtype=bool)
+        for i, string in enumerate(chunk):
+            if isinstance(string, str):
+                try:
+                    string = string.encode('latin-1')
+                except UnicodeEncodeError:
+                    valid[i] = False
+                    string = b""
+            encoded.append(string)
+
+        lengths = np.fromiter((len(b) for b in encoded),
+                              dtype=np.int64, count=len(encoded))
+        width = int(lengths.max()) if len(encoded) else 0
+        flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        # Padded matrix of symbol classes; short rows are filled with the
+        # identity column so they simply stop moving.
+        matrix = np.full((len(encoded), width), pad, dtype=np.intp)
+        matrix[np.arange(width) < lengths[:, None]] = byte_classes[flat]
+
+        states = np.zeros(len(encoded), dtype=np.intp)
+        for column in range(width):
+            states = table[states, matrix[:, column]]
+        return accepting[states] & valid
+
+    def simulate_many(self, strings, chunk_size=1 << 20):
+        """
+        Simulates the DFA on every string in an iterable at once and returns
+        a list of bools. With NumPy installed, consecutive strings are packed
+        into a padded symbol matrix of at most chunk_size cells and all
+        current states are advanced one column at a time. Strings longer than
+        chunk_size, and every string when NumPy is missing or the alphabet
+        does not fit in latin-1, go through simulate one at a time.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if np is None or self.byte_classes is None:
+            return [self.simulate(string) for string in strings]
+
+        results = []
+        chunk = []
+        longest = 1
+        for string in strings:
+            length = len(string)
+            if length > chunk_size:
+                if chunk:
+                    results.extend(self._simulate_chunk(chunk).tolist())
+                    chunk = []
+                    longest = 1
+                results.append(self.simulate(string))
+                continue
+            if (len(chunk) + 1) * max(longest, length) > chunk_size:
+                results.extend(self._simulate_chunk(chunk).tolist())
+                chunk = []
+                longest = 1
+            chunk.append(string)
+            longest = max(longest, length)
+        if chunk:
+            results.extend(self._simulate_chunk(chunk).tolist())
+        return results
+
+    def matcher(self):
+        return DFAMatcher(self)
+
+    def scan(self, text, mode=LEFTMOST_LONGEST):
+        """
+        Returns the (start, end) offsets of the substrings of text accepted by
+        the DFA, in a single pass over the compiled table. See scan_threads
+        for the meaning of mode.
+        """
+        classes = self._classify(text)
+        if classes is None:
+            get = self.symbol_ids.get
+            other = self.other_class
+            classes = [get(symbol, other) for symbol in text]
+
+        table = self.table
+        accepting = self.accepting
+
+        def step(state, symbol_class):
+            next_state = table[state + symbol_class]
+            return (next_state,) if next_state >= 0 else ()
+
+        return scan_threads((self.start_offset,), step,
+                            lambda state: accepting[state] == 1, classes, mode)
+
+    def simulate_reference(self, input_string):
+        """Dictionary-based simulation, kept as a reference for the compiled path."""
         current_state = self.start_state
         for symbol in input_string:
             if symbol not in self.alphabet:
@@ -21,25 +239,34 @@ class DFA:
                 return False
         return current_state in self.final_states
 
+    def simulate_profiled(self, input_string, profile):
+        """
+        Same result as simulate_reference, recording state visits and
+        transition hits in profile (a profiling.Profile). The compiled
+        simulate path carries no instrumentation at all.
+        """
+        visits = profile.state_visits
+        hits = profile.transition_hits
+        profile.runs += 1
+        current_state = self.start_state
+        visits[current_state] += 1
+        for symbol in input_string:
+            if symbol not in self.alphabet:
+                return False
+            next_state = self.transitions.get((current_state, symbol), None)
+            if next_state is None:
+                return False
+            hits[(current_state, symbol, next_state)] += 1
+            visits[next_state] += 1
+            profile.steps += 1
+            current_state = next_state
+        return current_state in self.final_states
 
-def parse_dfa_json(json_path):
-    load_rules(json_path)
-
-    required_sections = {'states', 'alphabet',
-                         'transitions', 'start_state', 'final_states'}
-    sections = get_sections(json_path)
-    missing = required_sections - set(sections)
-    if missing:
-        raise ValueError(f"Missing required sections in JSON: {missing}")
-
-    states = get_section_data(json_path, 'states')
-    alphabet = get_section_data(json_path, 'alphabet')
-    transitions_data = get_section_data(json_path, 'transitions')
-    start_state = get_section_data(json_path, 'start_state')
-    final_states = get_section_data(json_path, 'final_states')
 
+def parse_dfa_json(json_path):
     transitions = {}
-    for t in transitions_data:
+
+    def add_transition(t):
         required = ['current_state', 'input', 'next_state']
         if any(k not in t for k in required):
             raise ValueError("Transition missing required keys")
@@ -53,12 +280,195 @@ def parse_dfa_json(json_path):
             raise ValueError(f"Non-deterministic transition: {curr}, {inp}")
         transitions[transition_key] = next_state
 
-    if not isinstance(final_states, list):
+    rules = stream_rules(json_path, {'transitions': add_transition})
+
+    required_sections = {'states', 'alphabet',
+                         'transitions', 'start_state', 'final_states'}
+    sections = rules.keys()
+    missing = required_sections - set(sections)
+    if missing:
+        raise ValueError(f"Missing required sections in JSON: {missing}")
+
+    states = rules['states']
+    alphabet = rules['alphabet']
+    start_state = rules['start_state']
+    final_states = rules['final_states']
+
+    if not isinstance(final_states, (list, tuple)):
         final_states = [final_states]
 
     return DFA(states, alphabet, transitions, start_state, final_states)
 
 
+class DFAMatcher:
+    """
+    Resumable DFA simulation over the compiled table: input can be fed in
+    chunks of any size (str or bytes) and only the current state is kept.
+    """
+
+    def __init__(self, dfa):
+        self.dfa = dfa
+        self.reset()
+
+    def reset(self):
+        self.state = self.dfa.start_offset
+
+    def feed(self, chunk):
+        if self.state < 0:
+            return
+        classes = self.dfa._classify(chunk)
+        if classes is None:
+            self.state = DEAD_STATE
+            return
+
+        table = self.dfa.table
+        state = self.state
+        for symbol_class in classes:
+            state = table[state + symbol_class]
+            if state < 0:
+                break
+        self.state = state
+
+    def is_dead(self):
+        return self.state < 0
+
+    def is_accepting(self):
+        return self.state >= 0 and self.dfa.accepting[self.state] == 1
+
+    def snapshot(self):
+        return self.state
+
+    def restore(self, snapshot):
+        self.state = snapshot
+
+
+def _reachable_states(dfa):
+    reachable = {dfa.start_state}
+    stack = [dfa.start_state]
+    outgoing = {}
+    for (curr, symbol), next_state in dfa.transitions.items():
+        outgoing.setdefault(curr, []).append((symbol, next_state))
+    while stack:
+        state = stack.pop()
+        for symbol, next_state in outgoing.get(state, []):
+            if symbol in dfa.alphabet and next_state not in reachable:
+                reachable.add(next_state)
+                stack.append(next_state)
+    return reachable
+
+
+def minimize_dfa(dfa):
+    """
+    Returns an equivalent DFA with the fewest states, using Hopcroft's
+    partition refinement. Unreachable states are dropped first, missing
+    transitions are treated as going to an implicit dead state, and the block
+    holding that dead state is left out of the result, so the minimal DFA
+    stays partial just like the input. Each remaining state is named after the
+    smallest original state name it merges.
+    """
+    dead = object()
+    states = list(_reachable_states(dfa))
+    alphabet = sorted(dfa.alphabet)
+    all_states = states + [dead]
+
+    delta = {}
+    for state in all_states:
+        for symbol in alphabet:
+            next_state = dfa.transitions.get((state, symbol), dead) \
+                if state is not dead else dead
+            delta[(state, symbol)] = next_state
+
+    inverse = {symbol: {} for symbol in alphabet}
+    for (state, symbol), next_state in delta.items():
+        inverse[symbol].setdefault(next_state, []).append(state)
+
+    accepting = {s for s in states if s in dfa.final_states}
+    rejecting = set(all_states) - accepting
+    # Copies: blocks are split in place below.
+    blocks = [set(b) for b in (accepting, rejecting) if b]
+    block_of = {}
+    for i, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = i
+
+    waiting = {min(range(len(blocks)), key=lambda i: len(blocks[i]))}
+    while waiting:
+        splitter = set(blocks[waiting.pop()])
+        for symbol in alphabet:
+            predecessors = set()
+            for state in splitter:
+                predecessors.update(inverse[symbol].get(state, ()))
+
+            touched = {}
+            for state in predecessors:
+                touched.setdefault(block_of[state], set()).add(state)
+
+            for i, inside in touched.items():
+                block = blocks[i]
+                if len(inside) == len(block):
+                    continue
+                # The larger part keeps index i and only the smaller one is
+                # relabeled, so a state moves O(log n) times in all.
+                block.difference_update(inside)
+                if len(inside) > len(block):
+                    blocks[i], inside = inside, block
+                j = len(blocks)
+                blocks.append(inside)
+                for state in inside:
+                    block_of[state] = j
+                # Whether or not i was waiting, j has to be: either both
+                # halves are, or the smaller half suffices.
+                waiting.add(j)
+
+    dead_block = block_of[dead]
+    names = {}
+    for i, block in enumerate(blocks):
+        if i != dead_block:
+            names[i] = min(block)
+
+    transitions = {}
+    for state in states:
+        i = block_of[state]
+        for symbol in alphabet:
+            j = block_of[delta[(state, symbol)]]
+            if j != dead_block:
+                transitions[(names[i], symbol)] = names[j]
+
+    start = block_of[dfa.start_state]
+    if start == dead_block:
+        # The language is empty; keep a lone non-accepting start state.
+        return DFA([dfa.start_state], dfa.alphabet, {}, dfa.start_state, [])
+
+    final_states = {names[block_of[s]] for s in accepting}
+    return DFA(sorted(names.values()), dfa.alphabet, transitions,
+               names[start], sorted(final_states))
+
+
+def write_dfa_json(dfa, json_path):
+    """Writes a DFA in the same format parse_dfa_json reads."""
+    states = sorted(dfa.states, key=lambda s: (s != dfa.start_state, s))
+    order = {s: i for i, s in enumerate(states)}
+    transitions = [
+        {"current_state": curr, "input": symbol, "next_state": next_state}
+        for (curr, symbol), next_state in sorted(
+            dfa.transitions.items(),
+            key=lambda item: (order.get(item[0][0], len(order)), item[0][1]))
+    ]
+    lines = [
+        "{",
+        f'    "states": {json.dumps(states)},',
+        f'    "alphabet": {json.dumps(sorted(dfa.alphabet))},',
+        '    "transitions": [',
+        ",\n".join(f"        {json.dumps(t)}" for t in transitions),
+        "    ],",
+        f'    "start_state": {json.dumps(dfa.start_state)},',
+        f'    "final_states": {json.dumps(sorted(dfa.final_states))}',
+        "}",
+    ]
+    with open(json_path, 'w') as json_file:
+        json_file.write("\n".join(lines) + "\n")
+
+
 if __name__ == '__main__':
     try:
         if len(sys.argv) >= 3:
@@ -0,0 +1,265 @@
+import argparse
+import sys
+from collections import deque
+from convert import epsilon_closures
+from dfa import DFA
+from nfa import EPSILON, NFA
+from rules_cache import parse_machine
+
+MACHINE_TYPES = ('dfa', 'nfa')
+
+
+class Comparison:
+    """
+    The outcome of equivalent or included. Truthy when the check holds;
+    otherwise counterexample is a shortest string on which the two machines
+    disagree (accepted by the first machine only, for included).
+    """
+
+    def __init__(self, holds, counterexample=None):
+        self.holds = holds
+        self.counterexample = counterexample
+
+    def __bool__(self):
+        return self.holds
+
+    def __repr__(self):
+        if self.holds:
+            return "Comparison(holds=True)"
+        return f"Comparison(holds=False, counterexample={self.counterexample!r})"
+
+
+class _Successors:
+    """
+    Uniform view of a DFA or NFA for the checks below: the start states,
+    the epsilon-closed successors of one state on one symbol (cached), and
+    the final states. A DFA has at most one state active at a time.
+    """
+
+    def __init__(self, machine):
+        self.final_states = machine.final_states
+        self._cache = {}
+        if isinstance(machine, DFA):
+            self.start = frozenset([machine.start_state])
+            # DFA.simulate rejects symbols outside the alphabet.
+            self.symbols = {a for a in machine.alphabet if len(a) == 1}
+            self._post = self._dfa_post(machine)
+        elif isinstance(machine, NFA):
+            closures = epsilon_closures(machine)
+            self.start = closures[machine.start_state]
+            # NFA.simulate follows any transition whose symbol is read.
+            self.symbols = {a for (_, a) in machine.transitions if a != EPSILON and len(a) == 1}
+            self._post = self._nfa_post(machine, closures)
+        else:
+            raise ValueError("Only DFAs and NFAs can be compared")
+
+    @staticmethod
+    def _dfa_post(dfa):
+        def post(state, symbol):
+            if symbol not in dfa.alphabet or (state, symbol) not in dfa.transitions:
+                return frozenset()
+            return frozenset([dfa.transitions[(state, symbol)]])
+        return post
+
+    @staticmethod
+    def _nfa_post(nfa, closures):
+        def post(state, symbol):
+            reached = set()
+            for next_state in nfa.transitions.get((state, symbol), ()):
+                reached |= closures[next_state]
+            return frozenset(reached)
+        return post
+
+    def post(self, state, symbol):
+        key = (state, symbol)
+        reached = self._cache.get(key)
+        if reached is None:
+            reached = self._cache[key] = self._post(state, symbol)
+        return reached
+
+    def post_set(self, states, symbol):
+        reached = set()
+        for state in states:
+            reached |= self.post(state, symbol)
+        return frozenset(reached)
+
+    def accepts(self, states):
+        return not self.final_states.isdisjoint(states)
+
+
+def _word(parents, node):
+    symbols = []
+    while node is not None:
+        node, symbol = parents[node]
+        if symbol is not None:
+            symbols.append(symbol)
+    return "".join(reversed(symbols))
+
+
+def _included(a, b, symbols):
+    """
+    Antichain inclusion check, L(a) within L(b). Explores pairs (p, S) of
+    one state of a and the set of states b can be in after the same input,
+    breadth first, so the subset construction of b is only built as far as
+    needed. A pair is dropped when an earlier pair (p, S') has S' within S:
+    b is then at least as likely to accept from S, and the earlier pair was
+    reached by a string no longer. The first pair with p final and S not
+    accepting therefore yields a shortest counterexample.
+    """
+    antichain = {}
+    parents = []
+    queue = deque()
+
+    def visit(state, states, parent, symbol):
+        kept = antichain.setdefault(state, [])
+        if any(smaller <= states for smaller in kept):
+            return None
+        kept[:] = [larger for larger in kept if not states <= larger]
+        kept.append(states)
+        parents.append((parent, symbol))
+        node = len(parents) - 1
+        if state in a.final_states and not b.accepts(states):
+            return node
+        queue.append((state, states, node))
+        return None
+
+    for state in sorted(a.start, key=str):
+        bad = visit(state, b.start, None, None)
+        if bad is not None:
+            return Comparison(False, _word(parents, bad))
+
+    while queue:
+        state, states, node = queue.popleft()
+        for symbol in symbols:
+            next_states = b.post_set(states, symbol)
+            for next_state in sorted(a.post(state, symbol), key=str):
+                bad = visit(next_state, next_states, node, symbol)
+                if bad is not None:
+                    return Comparison(False, _word(parents, bad))
+    return Comparison(True)
+
+
+def _hopcroft_karp(a, b, symbols):
+    """
+    Hopcroft and Karp's near-linear DFA equivalence check. States of both
+    DFAs, plus an implicit dead state for each, live in one union-find;
+    pairs reached by the same string are merged, and a pair only needs
+    exploring when its two states are not already known to be equivalent.
+    Pairs are explored breadth first, so the first pair that disagrees on
+    acceptance gives a shortest counterexample.
+    """
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def single(states):
+        return next(iter(states), None)
+
+    start = (single(a.start), single(b.start))
+    if a.accepts(a.start) != b.accepts(b.start):
+        return Comparison(False, "")
+    parent[find(('a', start[0]))] = find(('b', start[1]))
+    parents = [(None, None)]
+    queue = deque([(start[0], start[1], 0)])
+
+    while queue:
+        p, q, node = queue.popleft()
+        for symbol in symbols:
+            next_p = single(a.post(p, symbol)) if p is not None else None
+            next_q = single(b.post(q, symbol)) if q is not None else None
+            root_p, root_q = find(('a', next_p)), find(('b', next_q))
+            if root_p == root_q:
+                continue
+            parents.append((node, symbol))
+            if (next_p in a.final_states) != (next_q in b.final_states):
+                return Comparison(False, _word(parents, len(parents) - 1))
+            parent[root_p] = root_q
+            queue.append((next_p, next_q, len(parents) - 1))
+    return Comparison(True)
+
+
+def _prepare(a, b):
+    a, b = _Successors(a), _Successors(b)
+    return a, b, sorted(a.symbols | b.symbols)
+
+
+def included(a, b):
+    """
+    Checks whether every string a accepts is accepted by b (each a DFA or an
+    NFA). On failure the Comparison carries a shortest string accepted by a
+    but not by b.
+    """
+    a, b, symbols = _prepare(a, b)
+    return _included(a, b, symbols)
+
+
+def equivalent(a, b):
+    """
+    Checks whether a and b (each a DFA or an NFA) accept exactly the same
+    strings. Two DFAs are compared with Hopcroft-Karp; otherwise inclusion
+    is checked both ways with antichains. On failure the Comparison carries
+    a shortest string accepted by exactly one of them.
+    """
+    if isinstance(a, DFA) and isinstance(b, DFA):
+        a, b, symbols = _prepare(a, b)
+        return _hopcroft_karp(a, b, symbols)
+
+    a, b, symbols = _prepare(a, b)
+    forward = _included(a, b, symbols)
+    backward = _included(b, a, symbols)
+    if forward and backward:
+        return Comparison(True)
+    counterexamples = [c.counterexample for c in (forward, backward) if not c]
+    return Comparison(False, min(counterexamples, key=lambda s: (len(s), s)))
+
+
+def _parse_spec(spec):
+    """Parses type:rules_file."""
+    machine_type, sep, rules_file = spec.partition(':')
+    machine_type = machine_type.lower()
+    if not sep or machine_type not in MACHINE_TYPES:
+        raise ValueError(f"Machine spec must look like dfa:rules_file or nfa:rules_file, got '{spec}'")
+    return machine_type, rules_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that two DFA/NFA rules files accept the same language. "
+                    "Exits with status 1 and prints a shortest counterexample when they do not.")
+    parser.add_argument('first', help="type:rules_file, e.g. nfa:nfa_rules.fa")
+    parser.add_argument('second', help="type:rules_file, e.g. dfa:nfa_min_dfa.fa")
+    parser.add_argument('--included', action='store_true',
+                        help="only check that the first machine's language is included in the second's")
+    args = parser.parse_args(argv)
+
+    first = parse_machine(*_parse_spec(args.first))
+    second = parse_machine(*_parse_spec(args.second))
+    if args.included:
+        result = included(first, second)
+        relation = "included in"
+    else:
+        result = equivalent(first, second)
+        relation = "equivalent to"
+
+    if result:
+        print(f"{args.first} is {relation} {args.second}")
+        return 0
+    print(f"{args.first} is not {relation} {args.second}")
+    print(f"Counterexample: \"{result.counterexample}\"")
+    return 1
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
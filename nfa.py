@@ -1,18 +1,68 @@
 import sys
+import time
 from read_file import *
 from collections import deque
+from scan import LEFTMOST_LONGEST, scan_threads
 
 EPSILON = ""
+DEFAULT_MAX_CACHED_STATES = 10000
 
 
 class NFA:
-    def __init__(self, states, alphabet, transitions, start_state, final_states):
+    def __init__(self, states, alphabet, transitions, start_state, final_states, max_cached_states=DEFAULT_MAX_CACHED_STATES):
         self.states = set(states)
         self.alphabet = set(alphabet)
         self.transitions = transitions
         self.start_state = start_state
         self.final_states = set(final_states)
 
+        if max_cached_states < 1:
+            raise ValueError("max_cached_states must be at least 1")
+        self.max_cached_states = max_cached_states
+        self.clear_cache()
+        self.compile()
+
+    def compile(self):
+        """
+        Builds the bitset form of the NFA. States are numbered, each state's
+        epsilon closure is computed once, and state sets become Python ints
+        with bit i set when state i is active. For every symbol and state,
+        symbol_masks holds the epsilon-closed set of successors, so one
+        simulation step is just OR-ing the masks of the active states.
+        """
+        state_names = [self.start_state]
+        seen = {self.start_state}
+        for (curr, _), next_states in self.transitions.items():
+            for state in [curr, *next_states]:
+                if state not in seen:
+                    seen.add(state)
+                    state_names.append(state)
+        for state in sorted(self.states - seen):
+            state_names.append(state)
+        self.state_ids = {s: i for i, s in enumerate(state_names)}
+
+        self.closure_masks = []
+        for state in state_names:
+            mask = 0
+            for reached in self._get_epsilon_closure({state}):
+                mask |= 1 << self.state_ids[reached]
+            self.closure_masks.append(mask)
+
+        self.symbol_masks = {}
+        for (curr, symbol), next_states in self.transitions.items():
+            if symbol == EPSILON:
+                continue
+            row = self.symbol_masks.setdefault(symbol, [0] * len(state_names))
+            for state in next_states:
+                row[self.state_ids[curr]] |= self.closure_masks[self.state_ids[state]]
+
+        self.start_mask = self.closure_masks[0]
+        self.final_mask = 0
+        for state in self.final_states:
+            if state in self.state_ids:
+                self.final_mask |= 1 << self.state_ids[state]
+        return self
+
     def _get_epsilon_closure(self, states_set):
         """
         Computes the epsilon closure for a set of states by finding all states
@@ -55,25 +105,214 @@ class NFA:
 
         return not current_states.isdisjoint(self.final_states)
 
+    def _get_epsilon_closure_profiled(self, states_set, profile):
+        started = time.perf_counter()
+        hits = profile.transition_hits
+        closure = set(states_set)
+        queue = deque(states_set)
 
-def parse_nfa_json(json_path):
-    load_rules(json_path)
+        while queue:
+            current_state = queue.popleft()
+            for state in self.transitions.get((current_state, EPSILON), ()):
+                hits[(current_state, EPSILON, state)] += 1
+                if state not in closure:
+                    closure.add(state)
+                    queue.append(state)
 
-    required_sections = {'states', 'alphabet',
-                         'transitions', 'start_state', 'final_states'}
-    sections = get_sections(json_path)
-    missing = required_sections - set(sections)
-    if missing:
-        raise ValueError(f"Missing required sections in JSON: {missing}")
+        profile.epsilon_closure_seconds += time.perf_counter() - started
+        return closure
+
+    def _record_states(self, states, profile):
+        visits = profile.state_visits
+        for state in states:
+            visits[state] += 1
+        profile.peak_active_states = max(profile.peak_active_states, len(states))
+
+    def simulate_profiled(self, input_string, profile):
+        """
+        Same result as simulate, recording state visits, transition hits
+        (epsilon moves included), the peak number of active states and the
+        time spent in epsilon closures in profile (a profiling.Profile).
+        """
+        hits = profile.transition_hits
+        profile.runs += 1
+        current_states = self._get_epsilon_closure_profiled({self.start_state}, profile)
+        self._record_states(current_states, profile)
+
+        for symbol in input_string:
+            next_states_after_symbol = set()
+            for state in current_states:
+                for next_state in self.transitions.get((state, symbol), ()):
+                    hits[(state, symbol, next_state)] += 1
+                    next_states_after_symbol.add(next_state)
+
+            if not next_states_after_symbol:
+                return False
+
+            profile.steps += 1
+            current_states = self._get_epsilon_closure_profiled(
+                next_states_after_symbol, profile)
+            self._record_states(current_states, profile)
+
+        return not current_states.isdisjoint(self.final_states)
+
+    def simulate_bitset(self, input_string):
+        """
+        Simulates the NFA on the precompiled bitset representation.
+        Gives the same results as simulate.
+        """
+        symbol_masks = self.symbol_masks
+        current_mask = self.start_mask
+
+        for symbol in input_string:
+            row = symbol_masks.get(symbol)
+            if row is None:
+                return False
+
+            next_mask = 0
+            remaining = current_mask
+            while remaining:
+                lowest = remaining & -remaining
+                next_mask |= row[lowest.bit_length() - 1]
+                remaining ^= lowest
+
+            if not next_mask:
+                return False
+            current_mask = next_mask
+
+        return (current_mask & self.final_mask) != 0
 
-    states = get_section_data(json_path, 'states')
-    alphabet = get_section_data(json_path, 'alphabet')
-    transitions_data = get_section_data(json_path, 'transitions')
-    start_state = get_section_data(json_path, 'start_state')
-    final_states = get_section_data(json_path, 'final_states')
+    def matcher(self):
+        return NFAMatcher(self)
 
+    def scan(self, text, mode=LEFTMOST_LONGEST):
+        """
+        Returns the (start, end) offsets of the substrings of text accepted by
+        the NFA, in a single pass over the bitset representation. See
+        scan_threads for the meaning of mode.
+        """
+        if isinstance(text, (bytes, bytearray, memoryview)):
+            text = bytes(text).decode('latin-1')
+
+        symbol_masks = self.symbol_masks
+        final_mask = self.final_mask
+
+        def bits(mask):
+            while mask:
+                lowest = mask & -mask
+                yield lowest.bit_length() - 1
+                mask ^= lowest
+
+        def step(state, symbol):
+            row = symbol_masks.get(symbol)
+            return bits(row[state]) if row is not None else ()
+
+        return scan_threads(list(bits(self.start_mask)), step,
+                            lambda state: (final_mask >> state) & 1, text, mode)
+
+    def clear_cache(self):
+        """Drops every lazily built DFA state."""
+        self._dfa_cache = {}
+        self.cache_flushes = 0
+
+    def _lazy_transition(self, current_states, symbol):
+        """
+        Returns the (memoized) epsilon-closed successor of a state set.
+        The cache maps each frozenset of NFA states to a row of
+        symbol -> frozenset transitions. When it already holds
+        max_cached_states rows it is flushed entirely, the way RE2 does it,
+        and rebuilt on demand from the current state set.
+        """
+        row = self._dfa_cache.get(current_states)
+        if row is None:
+            if len(self._dfa_cache) >= self.max_cached_states:
+                self._dfa_cache = {}
+                self.cache_flushes += 1
+            row = self._dfa_cache[current_states] = {}
+
+        next_states = row.get(symbol)
+        if next_states is None:
+            moved = set()
+            for state in current_states:
+                moved.update(self.transitions.get((state, symbol), set()))
+            next_states = frozenset(self._get_epsilon_closure(moved))
+            row[symbol] = next_states
+        return next_states
+
+    def simulate_lazy(self, input_string):
+        """
+        Simulates the NFA through a lazily built DFA: each distinct set of
+        active states is a DFA state whose transitions are computed the first
+        time they are needed and reused afterwards.
+        """
+        current_states = frozenset(
+            self._get_epsilon_closure({self.start_state}))
+
+        for symbol in input_string:
+            row = self._dfa_cache.get(current_states)
+            next_states = row.get(symbol) if row is not None else None
+            if next_states is None:
+                next_states = self._lazy_transition(current_states, symbol)
+            if not next_states:
+                return False
+            current_states = next_states
+
+        return not current_states.isdisjoint(self.final_states)
+
+
+class NFAMatcher:
+    """
+    Resumable NFA simulation over the bitset representation: input can be fed
+    in chunks of any size and only the active state mask is kept.
+    """
+
+    def __init__(self, nfa):
+        self.nfa = nfa
+        self.reset()
+
+    def reset(self):
+        self.mask = self.nfa.start_mask
+
+    def feed(self, chunk):
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = bytes(chunk).decode('latin-1')
+
+        symbol_masks = self.nfa.symbol_masks
+        current_mask = self.mask
+        for symbol in chunk:
+            if not current_mask:
+                break
+            row = symbol_masks.get(symbol)
+            if row is None:
+                current_mask = 0
+                break
+
+            next_mask = 0
+            remaining = current_mask
+            while remaining:
+                lowest = remaining & -remaining
+                next_mask |= row[lowest.bit_length() - 1]
+                remaining ^= lowest
+            current_mask = next_mask
+        self.mask = current_mask
+
+    def is_dead(self):
+        return self.mask == 0
+
+    def is_accepting(self):
+        return (self.mask & self.nfa.final_mask) != 0
+
+    def snapshot(self):
+        return self.mask
+
+    def restore(self, snapshot):
+        self.mask = snapshot
+
+
+def parse_nfa_json(json_path):
     transitions = {}
-    for t in transitions_data:
+
+    def add_transition(t):
         required = ['current_state', 'input', 'next_state']
         if any(k not in t for k in required):
             raise ValueError("Transition missing required keys")
@@ -82,14 +321,28 @@ def parse_nfa_json(json_path):
         inp = t['input']
         next_s = t['next_state']
 
-        next_states_list = next_s if isinstance(next_s, list) else [next_s]
+        next_states_list = next_s if isinstance(next_s, (list, tuple)) else [next_s]
 
         transition_key = (curr, inp)
         if transition_key not in transitions:
             transitions[transition_key] = set()
         transitions[transition_key].update(next_states_list)
 
-    if not isinstance(final_states, list):
+    rules = stream_rules(json_path, {'transitions': add_transition})
+
+    required_sections = {'states', 'alphabet',
+                         'transitions', 'start_state', 'final_states'}
+    sections = rules.keys()
+    missing = required_sections - set(sections)
+    if missing:
+        raise ValueError(f"Missing required sections in JSON: {missing}")
+
+    states = rules['states']
+    alphabet = rules['alphabet']
+    start_state = rules['start_state']
+    final_states = rules['final_states']
+
+    if not isinstance(final_states, (list, tuple)):
         final_states = [final_states]
 
     return NFA(states, alphabet, transitions, start_state, final_states)
@@ -0,0 +1,170 @@
+import argparse
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dfa import DEAD_STATE, parse_dfa_json
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Chunks smaller than this are not worth shipping to another process.
+MIN_CHUNK_SIZE = 1 << 16
+
+# Set once per worker process by _init_worker.
+_dfa = None
+
+
+def advance_runs(table, runs, classes):
+    """
+    Advances several runs of a compiled DFA over the same symbol classes.
+    runs maps each current state (a row offset into table) to the list of
+    start states whose run is there. Runs that reach the same state merge,
+    since they behave identically from then on, and runs that die are
+    dropped. DFA runs usually meet within a few symbols, so once a single run
+    is left the rest of classes is read with the plain simulate loop.
+    Returns the new runs.
+    """
+    position = 0
+    length = len(classes)
+    while len(runs) > 1 and position < length:
+        symbol_class = classes[position]
+        position += 1
+        next_runs = {}
+        for state, origins in runs.items():
+            next_state = table[state + symbol_class]
+            if next_state < 0:
+                continue
+            merged = next_runs.get(next_state)
+            if merged is None:
+                next_runs[next_state] = origins
+            else:
+                merged.extend(origins)
+        runs = next_runs
+
+    if runs and position < length:
+        (state, origins), = runs.items()
+        for symbol_class in memoryview(classes)[position:]:
+            state = table[state + symbol_class]
+            if state < 0:
+                return {}
+        runs = {state: origins}
+    return runs
+
+
+def chunk_mapping(dfa, source, start, end, origins=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Returns the state-to-state mapping of source[start:end] under dfa: a
+    dict from each start state (row offset) in origins, every state by
+    default, to the state its run ends in. Runs that die are left out.
+    source is read block_size bytes at a time, so a memory-mapped file is
+    never loaded whole.
+    """
+    if dfa.byte_classes is None:
+        raise ValueError("Parallel simulation needs an alphabet of single latin-1 characters")
+    if origins is None:
+        origins = range(0, len(dfa.table), dfa.width)
+    runs = {origin: [origin] for origin in origins}
+    table = dfa.table
+    byte_classes = dfa.byte_classes
+    for block_start in range(start, end, block_size):
+        if not runs:
+            break
+        block = source[block_start:min(block_start + block_size, end)]
+        runs = advance_runs(table, runs, block.translate(byte_classes))
+    return {origin: state for state, merged in runs.items() for origin in merged}
+
+
+def _init_worker(dfa):
+    global _dfa
+    _dfa = dfa
+
+
+def _map_file_chunk(path, start, end, origins, block_size):
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return chunk_mapping(_dfa, mapped, start, end, origins, block_size)
+
+
+def split_chunks(size, chunks):
+    """Splits range(size) into up to chunks contiguous (start, end) pairs of near-equal length."""
+    chunks = max(1, min(chunks, size))
+    bounds = [size * i // chunks for i in range(chunks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def simulate_file_parallel(dfa, path, workers=None, chunks=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Decides whether dfa accepts the contents of the file at path, splitting
+    it into chunks that worker processes map in parallel. Every worker
+    memory-maps the file itself, so the input is never sent between
+    processes. The first chunk only needs the run from the start state;
+    every other chunk is run from all states at once (see advance_runs),
+    since its starting state is not known yet. The per-chunk mappings are
+    then composed in order.
+
+    chunks defaults to one per worker, but no chunk shorter than
+    MIN_CHUNK_SIZE bytes. With workers=1 the chunks are mapped in this
+    process.
+    """
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if size == 0:
+        return dfa.accepting[dfa.start_offset] == 1
+
+    if chunks is None:
+        chunks = min(workers, size // MIN_CHUNK_SIZE or 1)
+    bounds = split_chunks(size, chunks)
+    jobs = [(path, start, end, [dfa.start_offset] if i == 0 else None, block_size)
+            for i, (start, end) in enumerate(bounds)]
+
+    if workers == 1 or len(jobs) == 1:
+        _init_worker(dfa)
+        mappings = (_map_file_chunk(*job) for job in jobs)
+        return _compose(dfa, mappings)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker,
+                             initargs=(dfa,)) as pool:
+        futures = [pool.submit(_map_file_chunk, *job) for job in jobs]
+        try:
+            return _compose(dfa, (future.result() for future in futures))
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _compose(dfa, mappings):
+    state = dfa.start_offset
+    for mapping in mappings:
+        state = mapping.get(state, DEAD_STATE)
+        if state < 0:
+            return False
+    return dfa.accepting[state] == 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a DFA over one large input file with several worker processes.")
+    parser.add_argument('rules_file')
+    parser.add_argument('input_file')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--chunks', type=int, default=None,
+                        help="chunks to split the input into (default: one per worker)")
+    args = parser.parse_args(argv)
+
+    result = simulate_file_parallel(parse_dfa_json(args.rules_file), args.input_file,
+                                    args.workers, args.chunks)
+    print(
+        f"The contents of \"{args.input_file}\" parsed through the DFA emulator return: {'Accepted' if result else 'Rejected'}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,12 +1,271 @@
 import sys
+import time
+import weakref
 from read_file import *
 from collections import deque
 
 EPSILON = ""
+PERSISTENT_STACK = "persistent"
+TUPLE_STACK = "tuple"
+GSS_STACK = "gss"
+STACK_MODES = (PERSISTENT_STACK, TUPLE_STACK, GSS_STACK)
+SEARCH_ENGINE = "search"
+EARLEY_ENGINE = "earley"
+ENGINES = (SEARCH_ENGINE, EARLEY_ENGINE)
+CLI_OPTIONS = ('stack-mode', 'max-stack-depth', 'max-configurations')
+# Reported by PDA.selected_engine when the search engine runs a
+# deterministic machine on a single stack.
+DETERMINISTIC_ENGINE = "deterministic"
+
+
+class StackNode:
+    """
+    One cell of a persistent linked stack: the top symbol plus the rest of
+    the stack, shared with every other stack built on it. Nodes are
+    hash-consed by StackInterner, so two equal stacks are the same object and
+    comparing or hashing a configuration does not depend on stack depth.
+    """
+    __slots__ = ('top', 'tail', '__weakref__')
+
+    def __init__(self, top, tail):
+        self.top = top
+        self.tail = tail
+
+    def to_tuple(self):
+        symbols = []
+        node = self
+        while node is not None:
+            symbols.append(node.top)
+            node = node.tail
+        return tuple(reversed(symbols))
+
+
+class StackInterner:
+    """Hands out one shared StackNode per distinct (top, tail) pair."""
+
+    def __init__(self):
+        self._nodes = weakref.WeakValueDictionary()
+
+    def push(self, tail, symbols):
+        """Pushes symbols so that symbols[0] ends up on top, like the tuple path."""
+        node = tail
+        for symbol in reversed(symbols):
+            key = (symbol, node)
+            interned = self._nodes.get(key)
+            if interned is None:
+                interned = StackNode(symbol, node)
+                self._nodes[key] = interned
+            node = interned
+        return node
+
+
+def _stack_depth(node, depths):
+    """Depth of a persistent stack, memoised in depths so shared tails are walked once."""
+    path = []
+    while node is not None and node not in depths:
+        path.append(node)
+        node = node.tail
+    depth = depths[node] if node is not None else 0
+    for walked in reversed(path):
+        depth += 1
+        depths[walked] = depth
+    return depth
+
+
+def _pop_through(pops, states, symbols):
+    """States reached from any of states by epsilon paths that pop symbols, top first."""
+    for symbol in symbols:
+        states = {popped for state in states for popped in pops.get((state, symbol), ())}
+        if not states:
+            break
+    return states
+
+
+def epsilon_summaries(transitions):
+    """
+    Summarises every epsilon path of a PDA by the (state, stack_top) it
+    starts from, so the epsilon closure of a configuration can be read off
+    tables instead of searched. Returns (replacements, pops, unbounded):
+
+    - pops[(q, X)] is the set of states r with (q, X) ->* (r, empty) using
+      epsilon moves only, i.e. paths whose net effect is to pop X. It is the
+      least fixed point of the moves (saturation, as in pre*).
+    - replacements[(q, X)] is the set of (r, w), w a non-empty string with
+      its top first, with (q, X) ->* (r, w) by epsilon moves that never pop
+      the cell X sat in (post*), leaving out (q, X) itself.
+    - unbounded is the set of pairs from which epsilon moves push without
+      bound. Their replacements are infinite, so they have no entry.
+
+    Every epsilon path from (q, X + rest) either stays above rest, ending in
+    some (r, w + rest) from replacements, or first pops X, reaching
+    (r, rest) for some r in pops, and goes on from there.
+    """
+    rules = [(state, top, next_state, push_symbols)
+             for (state, symbol, top), moves in transitions.items() if symbol == EPSILON
+             for next_state, push_symbols in moves]
+
+    pops = {}
+    changed = True
+    while changed:
+        changed = False
+        for state, top, next_state, push_symbols in rules:
+            reached = _pop_through(pops, {next_state}, push_symbols)
+            known = pops.setdefault((state, top), set())
+            if not reached <= known:
+                known |= reached
+                changed = True
+
+    # (q, X) -> (r, Y) when some epsilon path from (q, X) has Y on top in
+    # state r, `rise` cells above where X was, without popping X's cell.
+    edges = {}
+    for state, top, next_state, push_symbols in rules:
+        states = {next_state}
+        for offset, symbol in enumerate(push_symbols):
+            rise = len(push_symbols) - 1 - offset
+            for reached in states:
+                edges.setdefault((state, top), set()).add(((reached, symbol), rise))
+            states = _pop_through(pops, states, symbol)
+            if not states:
+                break
+
+    reachable = {}
+
+    def reach(pair):
+        if pair not in reachable:
+            seen = {pair}
+            queue = deque([pair])
+            while queue:
+                for target, _ in edges.get(queue.popleft(), ()):
+                    if target not in seen:
+                        seen.add(target)
+                        queue.append(target)
+            reachable[pair] = seen
+        return reachable[pair]
+
+    # Stacks grow without bound exactly when a cycle of these edges rises.
+    pumping = {source for source, targets in edges.items()
+               for target, rise in targets if rise and source in reach(target)}
+    unbounded = {pair for pair in edges if not pumping.isdisjoint(reach(pair))}
+
+    replacements = {}
+    for pair in edges:
+        if pair in unbounded:
+            continue
+        start = (pair[0], pair[1])
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            state, stack = queue.popleft()
+            for next_state, push_symbols in transitions.get((state, EPSILON, stack[0]), ()):
+                config = (next_state, push_symbols + stack[1:])
+                if config[1] and config not in seen:
+                    seen.add(config)
+                    queue.append(config)
+        seen.discard(start)
+        if seen:
+            replacements[pair] = seen
+    return replacements, pops, unbounded
+
+
+def deterministic_tables(transitions):
+    """
+    Decides whether a PDA is deterministic, and if so returns the tables
+    PDA.simulate_deterministic runs on: (moves, epsilon_moves,
+    live_epsilon_moves), mapping (state, symbol, top) or (state, top) to
+    (next_state, push_symbols reversed). Returns None otherwise.
+
+    A machine is deterministic when every (state, input, stack_top) has at
+    most one move and no (state, stack_top) with an epsilon move also reads
+    input. One exception is allowed: an epsilon move into states that can
+    never read input again (only epsilon moves are reachable from them)
+    competes with nothing while input remains, since it could only ever
+    matter at the end of the input. Those moves are left out of
+    live_epsilon_moves. Epsilon moves must also not form a cycle between
+    states, so each symbol costs a bounded number of moves.
+    """
+    moves = {}
+    epsilon_moves = {}
+    reads = set()
+    epsilon_edges = {}
+    for (state, symbol, top), results in transitions.items():
+        if len(results) > 1:
+            return None
+        for next_state, push_symbols in results:
+            if symbol == EPSILON:
+                epsilon_moves[(state, top)] = (next_state, push_symbols[::-1])
+                epsilon_edges.setdefault(state, set()).add(next_state)
+            else:
+                moves[(state, symbol, top)] = (next_state, push_symbols[::-1])
+                reads.add((state, top))
+
+    # States that can read input again, possibly after some epsilon moves.
+    can_read = {state for state, _ in reads}
+    changed = True
+    while changed:
+        changed = False
+        for state, next_states in epsilon_edges.items():
+            if state not in can_read and not can_read.isdisjoint(next_states):
+                can_read.add(state)
+                changed = True
+
+    live_epsilon_moves = {}
+    for key, move in epsilon_moves.items():
+        if move[0] in can_read:
+            if key in reads:
+                return None
+            live_epsilon_moves[key] = move
+
+    # Kahn's algorithm: every state must drop out of the epsilon graph.
+    indegree = {}
+    for next_states in epsilon_edges.values():
+        for next_state in next_states:
+            indegree[next_state] = indegree.get(next_state, 0) + 1
+    ready = [state for state in epsilon_edges if not indegree.get(state)]
+    removed = 0
+    while ready:
+        state = ready.pop()
+        removed += 1
+        for next_state in epsilon_edges.get(state, ()):
+            indegree[next_state] -= 1
+            if not indegree[next_state]:
+                ready.append(next_state)
+    if removed < len(set(epsilon_edges) | set(indegree)):
+        return None
+    return moves, epsilon_moves, live_epsilon_moves
+
+
+class GSSNode:
+    """
+    One cell of a graph-structured stack, as used by GLR parsers. A cell can
+    sit on several tails at once: the stacks it stands for are every path
+    from it down to the bottom (None). Cells are shared by everything pushed
+    by the same move at the same input position, so configurations whose
+    stacks differ only below that point are stored once. depth is the depth
+    of the stack the cell was first pushed onto.
+    """
+    __slots__ = ('top', 'tails', 'depth', '__weakref__')
+
+    def __init__(self, top, tail, depth):
+        self.top = top
+        self.tails = {tail}
+        self.depth = depth
+
+
+class SearchLimitReached(Exception):
+    """Raised by PDA.simulate when a cap cut the search short before any configuration accepted."""
+
+
+class _SearchLimits:
+    __slots__ = ('max_stack_depth', 'max_configurations', 'reached')
+
+    def __init__(self, max_stack_depth, max_configurations):
+        self.max_stack_depth = max_stack_depth
+        self.max_configurations = max_configurations
+        self.reached = None
 
 
 class PDA:
-    def __init__(self, states, input_alphabet, stack_alphabet, transitions, start_state, start_stack_symbol, final_states):
+    def __init__(self, states, input_alphabet, stack_alphabet, transitions, start_state, start_stack_symbol, final_states, stack_mode=PERSISTENT_STACK, engine=SEARCH_ENGINE, max_stack_depth=None, max_configurations=None):
         self.states = set(states)
         self.input_alphabet = set(input_alphabet)
         self.stack_alphabet = set(stack_alphabet)
@@ -14,8 +273,26 @@ class PDA:
         self.start_state = start_state
         self.start_stack_symbol = start_stack_symbol
         self.final_states = set(final_states)
+        self.stack_mode = stack_mode
+        self.interner = StackInterner()
+        self._gss_cells = weakref.WeakValueDictionary()
+        self.engine = engine
+        self.max_stack_depth = max_stack_depth
+        self.max_configurations = max_configurations
+        self._grammar = None
+        self._summaries = None
+        self._deterministic = deterministic_tables(transitions)
 
         # --- Validation ---
+        if self.stack_mode not in STACK_MODES:
+            raise ValueError(
+                f"Unknown stack mode '{self.stack_mode}', expected one of {STACK_MODES}")
+        if self.engine not in ENGINES:
+            raise ValueError(
+                f"Unknown engine '{self.engine}', expected one of {ENGINES}")
+        if (max_stack_depth is not None or max_configurations is not None) and self.stack_mode != GSS_STACK:
+            raise ValueError(
+                f"Stack depth and configuration caps need the '{GSS_STACK}' stack mode")
         if self.start_state not in self.states:
             raise ValueError(
                 f"Start state '{self.start_state}' not in states {self.states}")
@@ -54,12 +331,262 @@ class PDA:
                         queue.append((next_state, new_stack_list))
         return closure
 
-    def simulate(self, input_string):
+    def _get_epsilon_closure_persistent(self, config_set):
+        """
+        Same as _get_epsilon_closure, but for configurations whose stack is a
+        shared StackNode, and read off the tables from epsilon_summaries
+        instead of following epsilon moves one at a time: each configuration
+        gets its replacements pushed onto its tail, and only the paths that
+        pop its top carry on to the configurations below.
+        """
+        replacements, pops, _ = self._epsilon_summaries()
+        closure = set(config_set)
+        queue = deque(config_set)
+        push = self.interner.push
+
+        while queue:
+            current_state, stack = queue.popleft()
+            if stack is None:
+                continue
+
+            key = (current_state, stack.top)
+            for next_state, push_symbols_str in replacements.get(key, ()):
+                closure.add((next_state, push(stack.tail, push_symbols_str)))
+            for next_state in pops.get(key, ()):
+                new_config = (next_state, stack.tail)
+                if new_config not in closure:
+                    closure.add(new_config)
+                    queue.append(new_config)
+        return closure
+
+    def _epsilon_summaries(self):
+        if self._summaries is None:
+            self._summaries = epsilon_summaries(self.transitions)
+        return self._summaries
+
+    def _search_mode(self):
+        # Persistent stacks cannot hold the endless stacks of an unbounded
+        # epsilon push, so such machines are searched on the GSS instead.
+        if self.stack_mode == PERSISTENT_STACK and self._epsilon_summaries()[2]:
+            return GSS_STACK
+        return self.stack_mode
+
+    def _step_persistent(self, current_configs, symbol):
+        next_configs = set()
+        push = self.interner.push
+        for state, stack in current_configs:
+            if stack is None:
+                continue
+
+            transition_key = (state, symbol, stack.top)
+            if transition_key in self.transitions:
+                for next_state, push_symbols_str in self.transitions[transition_key]:
+                    next_configs.add(
+                        (next_state, push(stack.tail, push_symbols_str)))
+
+        if not next_configs:
+            return next_configs
+        return self._get_epsilon_closure_persistent(next_configs)
+
+    def _gss_closure(self, seeds, limits=None):
+        """
+        Builds the graph-structured stack for one input position. Each seed
+        (state, push_symbols, tail) is pushed, then epsilon moves are
+        followed until no new configuration (state, top cell) appears. A move
+        that puts the popped symbol back at the bottom of its push leaves the
+        cell in place and pushes the rest on top of it, so only real pops
+        fan out over a cell's tails.
+
+        When a cell pushed at this position gains a new tail after it has
+        already been popped by an epsilon move, that move is replayed on the
+        new tail, so no configuration is missed. A push cycle made of
+        epsilon moves becomes a cycle in the graph instead of an endless
+        search.
+
+        Configurations beyond limits.max_configurations and pushes deeper
+        than limits.max_stack_depth are dropped and noted in limits.reached.
+        Every push is checked, including one that only adds a tail to an
+        existing cell, but depth is measured through the tail's depth, which
+        is the depth its cell was first pushed at. A cell later reached over
+        a deeper stack, or through a push cycle, keeps that first depth, so
+        the cap bounds how deep cells are first created rather than the
+        length of every stack the graph stands for.
+        """
+        transitions = self.transitions
+        max_depth = limits.max_stack_depth if limits is not None else None
+        max_configs = limits.max_configurations if limits is not None else None
+        chains = {}
+        pops = {}
+        created = []
+        closure = set()
+        queue = deque()
+
+        def add(config):
+            if config in closure:
+                return
+            if max_configs is not None and len(closure) >= max_configs:
+                limits.reached = "Configuration limit reached"
+                return
+            closure.add(config)
+            queue.append(config)
+
+        def push(state, symbols, tail):
+            if not symbols:
+                add((state, tail))
+                return
+            depth = (tail.depth if tail is not None else 0) + len(symbols)
+            if max_depth is not None and depth > max_depth:
+                limits.reached = "Stack depth limit reached"
+                return
+
+            chain = chains.get((state, symbols))
+            if chain is None:
+                node = bottom = GSSNode(symbols[-1], tail, depth - len(symbols) + 1)
+                created.append(node)
+                for offset in range(len(symbols) - 2, -1, -1):
+                    node = GSSNode(symbols[offset], node, depth - offset)
+                    created.append(node)
+                chains[(state, symbols)] = (node, bottom)
+                pops[bottom] = []
+                add((state, node))
+            elif tail not in chain[1].tails:
+                bottom = chain[1]
+                bottom.tails.add(tail)
+                for next_state, push_symbols in list(pops[bottom]):
+                    push(next_state, push_symbols, tail)
+
+        for state, symbols, tail in seeds:
+            push(state, symbols, tail)
+
+        while queue:
+            state, node = queue.popleft()
+            if node is None:
+                continue
+            moves = transitions.get((state, EPSILON, node.top))
+            if not moves:
+                continue
+            applied = pops.get(node)
+            for next_state, push_symbols in moves:
+                if push_symbols and push_symbols[-1] == node.top:
+                    # Putting the top back is pushing the rest onto the cell.
+                    push(next_state, push_symbols[:-1], node)
+                    continue
+                if applied is not None:
+                    applied.append((next_state, push_symbols))
+                for tail in list(node.tails):
+                    push(next_state, push_symbols, tail)
+        return self._gss_canonicalize(closure, created)
+
+    def _gss_canonicalize(self, configs, created):
+        """
+        Once a position is complete its cells never gain tails again, so a
+        cell can be swapped for an earlier one with the same top and the same
+        tails: both stand for exactly the same stacks. Doing this bottom-up
+        keeps equal stacks pushed at different positions from multiplying
+        the tails of every cell above them. Cells on an epsilon push cycle
+        are left as they are.
+        """
+        cells = self._gss_cells
+        canonical = {}
+        pending = set(created)
+        for node in created:
+            pending.discard(node)
+            node.tails = {canonical.get(tail, tail) for tail in node.tails}
+            if not pending.isdisjoint(node.tails):
+                continue
+            key = (node.top, frozenset(node.tails))
+            existing = cells.get(key)
+            if existing is None:
+                cells[key] = existing = node
+            canonical[node] = existing
+        return {(state, canonical.get(node, node)) for state, node in configs}
+
+    def _step_gss(self, current_configs, symbol, limits=None):
+        transitions = self.transitions
+        seeds = []
+        for state, node in current_configs:
+            if node is None:
+                continue
+            moves = transitions.get((state, symbol, node.top))
+            if moves:
+                for next_state, push_symbols in moves:
+                    if push_symbols and push_symbols[-1] == node.top:
+                        seeds.append((next_state, push_symbols[:-1], node))
+                        continue
+                    for tail in node.tails:
+                        seeds.append((next_state, push_symbols, tail))
+
+        if not seeds:
+            return set()
+        return self._gss_closure(seeds, limits)
+
+    def _initial_configs(self, limits=None):
+        mode = self._search_mode()
+        if mode == GSS_STACK:
+            return self._gss_closure([(self.start_state, (self.start_stack_symbol,), None)], limits)
+        if mode == PERSISTENT_STACK:
+            initial_stack = self.interner.push(None, [self.start_stack_symbol])
+            return self._get_epsilon_closure_persistent({(self.start_state, initial_stack)})
+
         initial_stack = [self.start_stack_symbol]
         current_configs = set()
         current_configs.add((self.start_state, tuple(initial_stack)))
+        return self._get_epsilon_closure(current_configs)
 
-        current_configs = self._get_epsilon_closure(current_configs)
+    def _step(self, current_configs, symbol, limits=None):
+        """
+        Consumes one input symbol from every configuration and returns the
+        epsilon closure of the results (empty when no configuration survives).
+        """
+        mode = self._search_mode()
+        if mode == GSS_STACK:
+            return self._step_gss(current_configs, symbol, limits)
+        if mode == PERSISTENT_STACK:
+            return self._step_persistent(current_configs, symbol)
+
+        next_configs = set()
+        for state, stack_tuple in current_configs:
+            stack_list = list(stack_tuple)
+            stack_top = stack_list[-1] if stack_list else None
+
+            transition_key = (state, symbol, stack_top)
+            if transition_key in self.transitions:
+                for next_state, push_symbols_str in self.transitions[transition_key]:
+                    new_stack_list = stack_list[:-1]
+                    new_stack_list.extend(
+                        list(push_symbols_str[::-1]))
+
+                    next_configs.add((next_state, tuple(new_stack_list)))
+
+        if not next_configs:
+            return next_configs
+        return self._get_epsilon_closure(next_configs)
+
+    def _is_accepting(self, current_configs):
+        for state, stack in current_configs:
+            if state in self.final_states:
+                return True
+        return False
+
+    def simulate(self, input_string):
+        """
+        Returns whether the PDA accepts input_string. If max_stack_depth or
+        max_configurations cut the search short and no configuration
+        accepted, raises SearchLimitReached instead of guessing.
+        """
+        if self.engine == EARLEY_ENGINE:
+            return self.simulate_earley(input_string)
+        if self.selected_engine == DETERMINISTIC_ENGINE:
+            return self.simulate_deterministic(input_string)
+
+        limits = None
+        if self.max_stack_depth is not None or self.max_configurations is not None:
+            if self.stack_mode != GSS_STACK:
+                raise ValueError(
+                    f"Stack depth and configuration caps need the '{GSS_STACK}' stack mode")
+            limits = _SearchLimits(self.max_stack_depth, self.max_configurations)
+
+        current_configs = self._initial_configs(limits)
 
         for symbol in input_string:
             if symbol not in self.input_alphabet:
@@ -67,49 +594,274 @@ class PDA:
                     f"Warning: Symbol '{symbol}' not in input alphabet. String will be rejected.", file=sys.stderr)
                 return False
 
-            next_configs = set()
-            for state, stack_tuple in current_configs:
-                stack_list = list(stack_tuple)
-                stack_top = stack_list[-1] if stack_list else None
+            current_configs = self._step(current_configs, symbol, limits)
+            if not current_configs:
+                break
+
+        if current_configs and self._is_accepting(current_configs):
+            return True
+        if limits is not None and limits.reached:
+            raise SearchLimitReached(limits.reached)
+        return False
+
+    @property
+    def deterministic(self):
+        """Whether the machine passed the static check in deterministic_tables."""
+        return self._deterministic is not None
+
+    @property
+    def selected_engine(self):
+        """
+        The engine simulate runs: EARLEY_ENGINE, DETERMINISTIC_ENGINE for the
+        search engine on a deterministic machine with the default persistent
+        stack and no caps, or SEARCH_ENGINE.
+        """
+        if self.engine == EARLEY_ENGINE:
+            return EARLEY_ENGINE
+        if self._deterministic is not None and self.stack_mode == PERSISTENT_STACK \
+                and self.max_stack_depth is None and self.max_configurations is None:
+            return DETERMINISTIC_ENGINE
+        return SEARCH_ENGINE
+
+    def simulate_deterministic(self, input_string):
+        """
+        Runs a deterministic PDA on one list stack, top at the end, taking
+        exactly one move at a time: O(1) amortized stack work per move and
+        O(n) time overall. Epsilon moves into states that never read input
+        are only followed once the input is used up. Same result as simulate.
+        """
+        if self._deterministic is None:
+            raise ValueError("The PDA is not deterministic")
+        moves, epsilon_moves, live_epsilon_moves = self._deterministic
+        input_alphabet = self.input_alphabet
+        state = self.start_state
+        stack = [self.start_stack_symbol]
 
-                transition_key = (state, symbol, stack_top)
-                if transition_key in self.transitions:
-                    for next_state, push_symbols_str in self.transitions[transition_key]:
-                        new_stack_list = stack_list[:-1]
-                        new_stack_list.extend(
-                            list(push_symbols_str[::-1]))
+        for symbol in input_string:
+            if symbol not in input_alphabet:
+                print(
+                    f"Warning: Symbol '{symbol}' not in input alphabet. String will be rejected.", file=sys.stderr)
+                return False
+            while True:
+                if not stack:
+                    return False
+                top = stack[-1]
+                move = moves.get((state, symbol, top))
+                if move is not None:
+                    break
+                move = live_epsilon_moves.get((state, top))
+                if move is None:
+                    return False
+                state = move[0]
+                stack.pop()
+                stack.extend(move[1])
+            state = move[0]
+            stack.pop()
+            stack.extend(move[1])
+
+        while state not in self.final_states:
+            move = epsilon_moves.get((state, stack[-1])) if stack else None
+            if move is None:
+                return False
+            state = move[0]
+            stack.pop()
+            stack.extend(move[1])
+        return True
 
-                        next_configs.add((next_state, tuple(new_stack_list)))
+    def set_limits(self, max_stack_depth=None, max_configurations=None):
+        """
+        Caps the stack depth and the number of live configurations per input
+        position, switching to the graph-structured stack, which is the only
+        stack mode that enforces them. None leaves a cap off. The depth cap
+        applies to the depth a stack cell is first pushed at (see
+        _gss_closure); stacks that share a cell can run deeper.
+        """
+        self.stack_mode = GSS_STACK
+        self.max_stack_depth = max_stack_depth
+        self.max_configurations = max_configurations
+
+    def decide(self, input_string):
+        """Returns "Accepted", "Rejected" or "Undecided (...)" when a cap was hit."""
+        try:
+            return "Accepted" if self.simulate(input_string) else "Rejected"
+        except SearchLimitReached as e:
+            return f"Undecided ({e})"
+
+    def simulate_earley(self, input_string):
+        """
+        Decides acceptance by converting the PDA to a context-free grammar
+        (built once and cached) and running an Earley parser over the input.
+        Always runs in polynomial time, even for ambiguous machines or
+        epsilon moves that push without bound.
+        """
+        from cfg import earley_recognize, pda_to_cfg
+
+        for symbol in input_string:
+            if symbol not in self.input_alphabet:
+                print(
+                    f"Warning: Symbol '{symbol}' not in input alphabet. String will be rejected.", file=sys.stderr)
+                return False
+
+        if self._grammar is None:
+            self._grammar = pda_to_cfg(self)
+        return earley_recognize(self._grammar, input_string)
+
+    def _get_epsilon_closure_profiled(self, config_set, profile):
+        started = time.perf_counter()
+        hits = profile.transition_hits
+        closure = set(config_set)
+        queue = deque(config_set)
+        push = self.interner.push
+
+        while queue:
+            current_state, stack = queue.popleft()
+            if stack is None:
+                continue
+
+            top = stack.top
+            for next_state, push_symbols_str in self.transitions.get((current_state, EPSILON, top), ()):
+                hits[(current_state, EPSILON, top, next_state, push_symbols_str)] += 1
+                new_config = (next_state, push(stack.tail, push_symbols_str))
+                if new_config not in closure:
+                    closure.add(new_config)
+                    queue.append(new_config)
+
+        profile.epsilon_closure_seconds += time.perf_counter() - started
+        return closure
+
+    def _record_configs(self, configs, profile, depths):
+        visits = profile.state_visits
+        for state, stack in configs:
+            visits[state] += 1
+            profile.peak_stack_depth = max(profile.peak_stack_depth, _stack_depth(stack, depths))
+        profile.peak_configurations = max(profile.peak_configurations, len(configs))
+
+    def simulate_profiled(self, input_string, profile):
+        """
+        Runs the configuration search on persistent stacks, whatever the
+        engine, recording state visits, transition hits, the peak number of
+        live configurations, the deepest stack and the time spent in epsilon
+        closures in profile (a profiling.Profile). Raises ValueError for
+        machines whose epsilon moves can push without bound, which the
+        persistent stacks cannot search to the end.
+        """
+        unbounded = self._epsilon_summaries()[2]
+        if unbounded:
+            raise ValueError(
+                f"Cannot profile a PDA whose epsilon moves push without bound from {sorted(unbounded)}")
+        hits = profile.transition_hits
+        push = self.interner.push
+        depths = {}
+        profile.runs += 1
+
+        initial_stack = push(None, [self.start_stack_symbol])
+        current_configs = self._get_epsilon_closure_profiled(
+            {(self.start_state, initial_stack)}, profile)
+        self._record_configs(current_configs, profile, depths)
+
+        for symbol in input_string:
+            if symbol not in self.input_alphabet:
+                print(
+                    f"Warning: Symbol '{symbol}' not in input alphabet. String will be rejected.", file=sys.stderr)
+                return False
+
+            next_configs = set()
+            for state, stack in current_configs:
+                if stack is None:
+                    continue
+                top = stack.top
+                for next_state, push_symbols_str in self.transitions.get((state, symbol, top), ()):
+                    hits[(state, symbol, top, next_state, push_symbols_str)] += 1
+                    next_configs.add((next_state, push(stack.tail, push_symbols_str)))
 
             if not next_configs:
                 return False
-            current_configs = self._get_epsilon_closure(next_configs)
 
-        for state, stack in current_configs:
-            if state in self.final_states:
-                return True
+            profile.steps += 1
+            current_configs = self._get_epsilon_closure_profiled(next_configs, profile)
+            self._record_configs(current_configs, profile, depths)
 
-        return False
+        return self._is_accepting(current_configs)
+
+    def matcher(self):
+        return PDAMatcher(self)
+
+
+class PDAMatcher:
+    """
+    Resumable PDA simulation: input can be fed in chunks of any size and the
+    set of live configurations is carried over between them.
+    """
+
+    def __init__(self, pda):
+        self.pda = pda
+        self.reset()
+
+    def reset(self):
+        self.configs = frozenset(self.pda._initial_configs())
+
+    def feed(self, chunk):
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = bytes(chunk).decode('latin-1')
+
+        configs = self.configs
+        for symbol in chunk:
+            if not configs:
+                break
+            if symbol not in self.pda.input_alphabet:
+                configs = set()
+                break
+            configs = self.pda._step(configs, symbol)
+        self.configs = frozenset(configs)
+
+    def is_dead(self):
+        return not self.configs
+
+    def is_accepting(self):
+        return self.pda._is_accepting(self.configs)
+
+    def snapshot(self):
+        return self.configs
+
+    def restore(self, snapshot):
+        self.configs = snapshot
 
 
 def parse_pda_json(json_path):
     """Parses a JSON file defining a PDA."""
-    load_rules(json_path)
+    transitions = {}
+
+    def add_transition(t):
+        required_keys = {'current_state', 'input',
+                         'stack_top', 'next_state', 'push_symbols'}
+        if not isinstance(t, dict) or not required_keys.issubset(t.keys()):
+            raise ValueError(
+                f"Transition missing required keys: {t}. Required: {required_keys}")
+
+        transition_key = (t['current_state'], t['input'], t['stack_top'])
+        transition_result = (t['next_state'], t['push_symbols'])
+
+        if transition_key not in transitions:
+            transitions[transition_key] = set()
+        transitions[transition_key].add(transition_result)
+
+    # Transitions are validated below, once every section is known.
+    rules = stream_rules(json_path, {'transitions': add_transition})
 
     required_sections = {'states', 'input_alphabet', 'stack_alphabet',
                          'transitions', 'start_state', 'start_stack_symbol', 'final_states'}
-    actual_sections = set(get_sections(json_path))
+    actual_sections = set(rules.keys())
     missing = required_sections - actual_sections
     if missing:
         raise ValueError(f"Missing required sections in JSON: {missing}")
 
-    states = get_section_data(json_path, 'states')
-    input_alphabet = get_section_data(json_path, 'input_alphabet')
-    stack_alphabet = get_section_data(json_path, 'stack_alphabet')
-    transitions_data = get_section_data(json_path, 'transitions')
-    start_state = get_section_data(json_path, 'start_state')
-    start_stack_symbol = get_section_data(json_path, 'start_stack_symbol')
-    final_states = get_section_data(json_path, 'final_states')
+    states = rules['states']
+    input_alphabet = rules['input_alphabet']
+    stack_alphabet = rules['stack_alphabet']
+    transitions_data = rules['transitions']
+    start_state = rules['start_state']
+    start_stack_symbol = rules['start_stack_symbol']
+    final_states = rules['final_states']
 
     if not isinstance(states, list):
         raise ValueError("states must be a list")
@@ -117,7 +869,7 @@ def parse_pda_json(json_path):
         raise ValueError("input_alphabet must be a list")
     if not isinstance(stack_alphabet, list):
         raise ValueError("stack_alphabet must be a list")
-    if not isinstance(transitions_data, list):
+    if not isinstance(transitions_data, ArrayStream):
         raise ValueError("transitions must be a list")
     if not isinstance(start_state, str):
         raise ValueError("start_state must be a string")
@@ -126,46 +878,30 @@ def parse_pda_json(json_path):
     if not isinstance(final_states, list):
         raise ValueError("final_states must be a list")
 
-    transitions = {}
-    for t in transitions_data:
-        required_keys = {'current_state', 'input',
-                         'stack_top', 'next_state', 'push_symbols'}
-        if not required_keys.issubset(t.keys()):
-            raise ValueError(
-                f"Transition missing required keys: {t}. Required: {required_keys}")
-
-        curr = t['current_state']
-        inp = t['input']
-        stack_top = t['stack_top']
-        next_s = t['next_state']
-        push = t['push_symbols']
-
+    states_set = set(states)
+    input_set = set(input_alphabet)
+    stack_set = set(stack_alphabet)
+    for (curr, inp, stack_top), results in transitions.items():
         # basic validation
-        if curr not in states:
+        if curr not in states_set:
             raise ValueError(
                 f"Transition state '{curr}' not in defined states.")
-        if inp != EPSILON and inp not in input_alphabet:
+        if inp != EPSILON and inp not in input_set:
             raise ValueError(
                 f"Transition input '{inp}' not in defined input alphabet.")
-        if stack_top not in stack_alphabet:
+        if stack_top not in stack_set:
             raise ValueError(
                 f"Transition stack_top '{stack_top}' not in defined stack alphabet.")
-        if next_s not in states:
-            raise ValueError(
-                f"Transition next_state '{next_s}' not in defined states.")
-        for char in push:
-            if char not in stack_alphabet:
+        for next_s, push in results:
+            if next_s not in states_set:
                 raise ValueError(
-                    f"Transition push_symbols '{push}' contains '{char}' not in defined stack alphabet.")
+                    f"Transition next_state '{next_s}' not in defined states.")
+            for char in push:
+                if char not in stack_set:
+                    raise ValueError(
+                        f"Transition push_symbols '{push}' contains '{char}' not in defined stack alphabet.")
         # end validation
 
-        transition_key = (curr, inp, stack_top)
-        transition_result = (next_s, push)
-
-        if transition_key not in transitions:
-            transitions[transition_key] = set()
-        transitions[transition_key].add(transition_result)
-
     return PDA(states, input_alphabet, stack_alphabet, transitions, start_state, start_stack_symbol, final_states)
 
 
@@ -177,15 +913,38 @@ if __name__ == '__main__':
         else:
             rules_file = input("Input your rule filename: ")
             input_string = input("Input your input string: ")
+        options = {}
+        positional = []
+        for arg in sys.argv[3:]:
+            if not arg.startswith('--'):
+                positional.append(arg)
+                continue
+            key, sep, value = arg[2:].partition('=')
+            if key not in CLI_OPTIONS or not sep:
+                raise ValueError(
+                    f"Unknown option '{arg}', expected one of {[f'--{option}=...' for option in CLI_OPTIONS]}")
+            options[key] = value
+        engine = positional[0] if positional else SEARCH_ENGINE
+        if engine not in ENGINES:
+            raise ValueError(
+                f"Unknown engine '{engine}', expected one of {ENGINES}")
 
         print(f"Loading PDA rules from: {rules_file}")
         pda = parse_pda_json(rules_file)
-        print(f"Simulating string: \"{input_string}\"")
+        pda.engine = engine
+        pda.stack_mode = options.get('stack-mode', pda.stack_mode)
+        if pda.stack_mode not in STACK_MODES:
+            raise ValueError(
+                f"Unknown stack mode '{pda.stack_mode}', expected one of {STACK_MODES}")
+        if 'max-stack-depth' in options or 'max-configurations' in options:
+            pda.set_limits(int(options['max-stack-depth']) if 'max-stack-depth' in options else None,
+                           int(options['max-configurations']) if 'max-configurations' in options else None)
+        print(f"Simulating string: \"{input_string}\" (engine: {pda.selected_engine})")
 
-        result = pda.simulate(input_string)
+        result = pda.decide(input_string)
 
         print(
-            f"\nThe string \"{input_string}\" parsed through the PDA emulator is: {'Accepted' if result else 'Rejected'}")
+            f"\nThe string \"{input_string}\" parsed through the PDA emulator is: {result}")
 
     except (FileNotFoundError, ValueError, TypeError) as e:
         print(f"Error: {str(e)}", file=sys.stderr)
@@ -0,0 +1,227 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from batch import DEFAULT_STEP_LIMIT
+from rules_cache import MACHINE_TYPES, parse_machine
+
+EPSILON_LABEL = "ε"
+
+
+class Profile:
+    """
+    Counters filled in by the simulate_profiled method of DFA, NFA, PDA and
+    TuringMachine. One Profile can collect any number of runs of the same
+    machine. The plain simulate methods never touch a Profile, so profiling
+    costs nothing unless it is asked for.
+
+    transition_hits is keyed by the transition taken:
+
+    - DFA, NFA: (state, symbol, next_state), symbol "" for epsilon moves
+    - PDA: (state, symbol, stack_top, next_state, push_symbols)
+    - TM: (state, read, next_state, write, move)
+    """
+
+    def __init__(self, machine_type):
+        if machine_type not in MACHINE_TYPES:
+            raise ValueError(f"Unsupported machine type: {machine_type}")
+        self.machine_type = machine_type
+        self.runs = 0
+        self.steps = 0
+        self.seconds = 0.0
+        self.results = Counter()
+        self.state_visits = Counter()
+        self.transition_hits = Counter()
+        self.peak_active_states = 0
+        self.peak_configurations = 0
+        self.peak_stack_depth = 0
+        self.tape_extent = None
+        self.epsilon_closure_seconds = 0.0
+
+    def record_tape_extent(self, lowest, highest):
+        if self.tape_extent is not None:
+            lowest = min(lowest, self.tape_extent[0])
+            highest = max(highest, self.tape_extent[1])
+        self.tape_extent = (lowest, highest)
+
+    def hot_transitions(self, n=10):
+        return self.transition_hits.most_common(n)
+
+    def to_dict(self):
+        data = {
+            "machine_type": self.machine_type,
+            "runs": self.runs,
+            "steps": self.steps,
+            "seconds": self.seconds,
+            "results": dict(self.results),
+            "state_visits": dict(self.state_visits.most_common()),
+            "transition_hits": [{"transition": list(key), "hits": hits}
+                                for key, hits in self.transition_hits.most_common()],
+        }
+        if self.machine_type in ('nfa', 'pda'):
+            data["epsilon_closure_seconds"] = self.epsilon_closure_seconds
+        if self.machine_type == 'nfa':
+            data["peak_active_states"] = self.peak_active_states
+        if self.machine_type == 'pda':
+            data["peak_configurations"] = self.peak_configurations
+            data["peak_stack_depth"] = self.peak_stack_depth
+        if self.machine_type == 'tm':
+            data["tape_extent"] = list(self.tape_extent) if self.tape_extent else None
+        return data
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def to_dot(self, machine):
+        """
+        Renders the machine as a Graphviz digraph, shading states by visit
+        count and transitions by hit count, from pale yellow to red for the
+        hottest; transitions never taken are grey. Parallel transitions
+        between two states share one edge labelled with each transition and
+        its hits.
+        """
+        edges = {}
+        for source, target, label, key in _transitions(machine, self.machine_type):
+            edges.setdefault((source, target), []).append((label, self.transition_hits.get(key, 0)))
+
+        states = sorted(machine.states, key=str)
+        final_states = _final_states(machine, self.machine_type)
+        max_visits = max([self.state_visits.get(s, 0) for s in states] + [1])
+        max_hits = max([hits for labels in edges.values() for _, hits in labels] + [1])
+
+        lines = ["digraph automaton {", "    rankdir=LR;",
+                 '    node [style=filled, fontname="Helvetica"];',
+                 '    edge [fontname="Helvetica"];',
+                 '    __start [shape=point, style=invis];']
+        for state in states:
+            visits = self.state_visits.get(state, 0)
+            shape = "doublecircle" if state in final_states else "circle"
+            lines.append(f"    {_quote(state)} [shape={shape}, fillcolor=\"{_heat(visits / max_visits)}\", "
+                         f"tooltip=\"{visits} visits\"];")
+        lines.append(f"    __start -> {_quote(machine.start_state)};")
+
+        for (source, target), labels in sorted(edges.items(), key=lambda item: tuple(map(str, item[0]))):
+            hits = sum(h for _, h in labels)
+            ratio = max(h for _, h in labels) / max_hits
+            label = "\n".join(f"{text} ({h})" for text, h in labels)
+            color = _heat(ratio) if hits else "0.000 0.000 0.750"
+            lines.append(f"    {_quote(source)} -> {_quote(target)} [label={_quote(label)}, "
+                         f"color=\"{color}\", penwidth={1 + 4 * ratio:.2f}];")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def _heat(ratio):
+    # HSV from pale yellow (cold) to saturated red (hot).
+    return f"{0.15 * (1 - ratio):.3f} {0.1 + 0.9 * ratio:.3f} 1.000"
+
+
+def _quote(value):
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f"\"{text}\""
+
+
+def _symbol(symbol):
+    return symbol if symbol != "" else EPSILON_LABEL
+
+
+def _final_states(machine, machine_type):
+    if machine_type == 'tm':
+        return {machine.accept_state}
+    return machine.final_states
+
+
+def _transitions(machine, machine_type):
+    """Yields (source, target, label, hit key) for every transition of the machine."""
+    if machine_type == 'dfa':
+        for (state, symbol), next_state in machine.transitions.items():
+            yield state, next_state, _symbol(symbol), (state, symbol, next_state)
+    elif machine_type == 'nfa':
+        for (state, symbol), next_states in machine.transitions.items():
+            for next_state in next_states:
+                yield state, next_state, _symbol(symbol), (state, symbol, next_state)
+    elif machine_type == 'pda':
+        for (state, symbol, top), moves in machine.transitions.items():
+            for next_state, push in moves:
+                yield (state, next_state, f"{_symbol(symbol)}, {top}/{_symbol(push)}",
+                       (state, symbol, top, next_state, push))
+    else:
+        for (state, read), (next_state, write, move) in machine.transitions.items():
+            yield state, next_state, f"{read}/{write},{move}", (state, read, next_state, write, move)
+
+
+def profile_machine(machine_type, machine, strings, step_limit=DEFAULT_STEP_LIMIT, profile=None):
+    """Runs every string through simulate_profiled and returns the Profile."""
+    if profile is None:
+        profile = Profile(machine_type)
+    for string in strings:
+        started = time.perf_counter()
+        if machine_type == 'tm':
+            result = machine.simulate_profiled(string, profile, step_limit)
+        else:
+            result = 'Accepted' if machine.simulate_profiled(string, profile) else 'Rejected'
+        profile.seconds += time.perf_counter() - started
+        profile.results[result] += 1
+    return profile
+
+
+def _print_summary(profile, top):
+    print(f"{profile.runs} runs, {profile.steps} steps in {profile.seconds:.4f}s: {dict(profile.results)}")
+    if profile.machine_type in ('nfa', 'pda'):
+        print(f"Time in epsilon closure: {profile.epsilon_closure_seconds:.4f}s")
+    if profile.machine_type == 'nfa':
+        print(f"Peak active states: {profile.peak_active_states}")
+    if profile.machine_type == 'pda':
+        print(f"Peak configurations: {profile.peak_configurations}, "
+              f"peak stack depth: {profile.peak_stack_depth}")
+    if profile.machine_type == 'tm' and profile.tape_extent:
+        print(f"Tape extent: cells {profile.tape_extent[0]} to {profile.tape_extent[1]}")
+    print("Hottest states:")
+    for state, visits in profile.state_visits.most_common(top):
+        print(f"  {state}: {visits}")
+    print("Hottest transitions:")
+    for key, hits in profile.hot_transitions(top):
+        print(f"  {key}: {hits}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Profile which states and transitions an emulator spends its time in.")
+    parser.add_argument('machine_type', choices=MACHINE_TYPES)
+    parser.add_argument('rules_file')
+    parser.add_argument('inputs', nargs='*', help="input strings to run")
+    parser.add_argument('-f', '--input-file', help="file with one input string per line")
+    parser.add_argument('--json', help="write the profile as JSON to this file")
+    parser.add_argument('--dot', help="write a Graphviz heatmap of the machine to this file")
+    parser.add_argument('--top', type=int, default=10, help="hottest states and transitions to print")
+    parser.add_argument('--step-limit', type=int, default=DEFAULT_STEP_LIMIT,
+                        help="per-string step limit for Turing machines")
+    args = parser.parse_args(argv)
+
+    strings = list(args.inputs)
+    if args.input_file:
+        with open(args.input_file) as f:
+            strings.extend(line.rstrip('\r\n') for line in f)
+
+    machine = parse_machine(args.machine_type, args.rules_file)
+    profile = profile_machine(args.machine_type, machine, strings, args.step_limit)
+    _print_summary(profile, args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(profile.to_json())
+    if args.dot:
+        with open(args.dot, 'w') as f:
+            f.write(profile.to_dot(machine))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,7 +1,8 @@
 import json
 import re
+from collections.abc import Mapping
+from types import MappingProxyType
 
-data = {}
 
 def remove_comments(json_str):
     def replacer(match):
@@ -16,21 +17,293 @@ def remove_comments(json_str):
     return cleaned
 
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class Rules(Mapping):
+    """
+    The parsed contents of one rules file. Sections map to read-only data:
+    JSON arrays become tuples and JSON objects read-only mappings, so a
+    Rules object can be shared freely between callers and threads.
+    """
+
+    def __init__(self, path, data):
+        if not isinstance(data, dict):
+            raise ValueError(f"Rules file {path} must contain a JSON object")
+        self.path = path
+        self._data = MappingProxyType({k: _freeze(v) for k, v in data.items()})
+
+    def __getitem__(self, section):
+        return self._data[section]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def sections(self):
+        return list(self._data.keys())
+
+
 def load_rules(f):
+    """Parses a rules file and returns it as a Rules object."""
     with open(f) as json_file:
         content = remove_comments(json_file.read())
-        global data
-        data = json.loads(content)
-        return data
+        return Rules(f, json.loads(content))
 
 
 def get_sections(f):
-    if not data:
-        load_rules(f)
-    return list(data.keys())
+    return load_rules(f).sections()
 
 
 def get_section_data(f, section):
-    if not data:
-        load_rules(f)
-    return data[section]
\ No newline at end of file
+    return load_rules(f)[section]
+
+
+STREAM_CHUNK_SIZE = 1 << 16
+_decoder = json.JSONDecoder()
+
+
+class CommentStripper:
+    """
+    Incremental version of remove_comments: strips // and /* */ comments
+    outside of quoted strings from text fed in chunks of any size.
+    """
+
+    # Plain text together with any complete quoted strings in it.
+    _NORMAL = re.compile(r'(?:[^"\'/]+|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')+')
+    _DOUBLE = re.compile(r'(?:[^"\\]|\\.)*')
+    _SINGLE = re.compile(r"(?:[^'\\]|\\.)*")
+
+    def __init__(self):
+        self.mode = 'normal'
+        self.pending = ""
+
+    def feed(self, chunk, final=False):
+        text = self.pending + chunk
+        self.pending = ""
+        out = []
+        i = 0
+        n = len(text)
+
+        while i < n:
+            if self.mode == 'normal':
+                match = self._NORMAL.match(text, i)
+                if match:
+                    out.append(match.group())
+                    i = match.end()
+                    continue
+                char = text[i]
+                if char == '/':
+                    if i + 1 == n and not final:
+                        break
+                    following = text[i + 1:i + 2]
+                    if following == '/':
+                        self.mode = 'line'
+                        i += 2
+                    elif following == '*':
+                        self.mode = 'block'
+                        i += 2
+                    else:
+                        out.append(char)
+                        i += 1
+                else:
+                    self.mode = char
+                    out.append(char)
+                    i += 1
+
+            elif self.mode in ('"', "'"):
+                pattern = self._DOUBLE if self.mode == '"' else self._SINGLE
+                match = pattern.match(text, i)
+                out.append(match.group())
+                i = match.end()
+                if i < n and text[i] == self.mode:
+                    out.append(self.mode)
+                    self.mode = 'normal'
+                    i += 1
+                elif i < n:
+                    # A lone trailing backslash: wait for the escaped character.
+                    break
+
+            elif self.mode == 'line':
+                end = text.find('\n', i)
+                if end < 0:
+                    i = n
+                else:
+                    self.mode = 'normal'
+                    i = end
+
+            else:
+                end = text.find('*/', i)
+                if end < 0:
+                    # Keep a trailing '*' in case the chunk splits "*/".
+                    i = n - 1 if text.endswith('*') and not final else n
+                    break
+                self.mode = 'normal'
+                i = end + 2
+
+        self.pending = text[i:]
+        return "".join(out)
+
+
+class ArrayStream:
+    """
+    Iterator over the elements of one JSON array section, decoded one at a
+    time while the rules file is being read.
+    """
+
+    def __init__(self, reader, section):
+        self._reader = reader
+        self.section = section
+        self._done = False
+        self._first = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        reader = self._reader
+        char = reader.peek()
+        if char == ']':
+            reader.advance()
+            self._done = True
+            raise StopIteration
+        if not self._first:
+            reader.expect(',')
+        self._first = False
+        return reader.decode_value()
+
+    def drain(self):
+        for _ in self:
+            pass
+
+
+def _ends_number(char):
+    return char.isspace() or char in ',]}'
+
+
+class _StreamingReader:
+    def __init__(self, json_file, chunk_size):
+        self.file = json_file
+        self.chunk_size = chunk_size
+        self.stripper = CommentStripper()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.file.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            tail = self.stripper.feed("", final=True)
+        else:
+            tail = self.stripper.feed(chunk)
+        if self.position > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        self.buffer += tail
+        return True
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of rules file {self.file.name}")
+
+    def advance(self):
+        self.position += 1
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                f"Expected '{char}' but found '{found}' in rules file {self.file.name}")
+        self.advance()
+
+    def decode_value(self):
+        self.peek()
+        attempts = 0
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+                # Read ever larger chunks so a large value is not re-decoded
+                # once per chunk.
+                attempts += 1
+                if not self._fill(self.chunk_size << min(attempts, 12)):
+                    raise ValueError(f"Invalid JSON in rules file {self.file.name}: {e}")
+                continue
+            # A value at the very end of the buffer may continue in the next
+            # chunk. A number cut just before its ".", "e" or "-" part decodes
+            # as its prefix ("0." as 0), so it is only complete once a
+            # delimiter follows it.
+            if not self.eof and (end == len(self.buffer) or (
+                    type(value) in (int, float) and not _ends_number(self.buffer[end]))):
+                self._fill()
+                continue
+            self.position = end
+            return value
+
+
+def iter_rules(f, streamed_sections=('transitions',), chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads a rules file incrementally and yields (section, value) pairs in
+    file order. Sections named in streamed_sections whose value is an array
+    are yielded as an ArrayStream, which decodes one element at a time; it
+    must be consumed before the next pair is requested (anything left is
+    skipped). Peak memory is one chunk plus one element, whatever the size
+    of the file.
+    """
+    with open(f) as json_file:
+        reader = _StreamingReader(json_file, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+
+        while True:
+            section = reader.decode_value()
+            if not isinstance(section, str):
+                raise ValueError(f"Section names must be strings in rules file {f}")
+            reader.expect(':')
+
+            if section in streamed_sections and reader.peek() == '[':
+                reader.advance()
+                stream = ArrayStream(reader, section)
+                yield section, stream
+                stream.drain()
+            else:
+                yield section, reader.decode_value()
+
+            if reader.peek() == '}':
+                return
+            reader.expect(',')
+
+
+def stream_rules(f, handlers, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads a rules file with iter_rules, passing every element of the
+    sections in handlers to handlers[section] as soon as it is decoded.
+    Returns a dict of all sections; handled array sections map to their
+    exhausted ArrayStream, so their elements are never all held in memory.
+    """
+    sections = {}
+    for section, value in iter_rules(f, tuple(handlers), chunk_size):
+        if section in handlers:
+            handler = handlers[section]
+            for item in value:
+                handler(item)
+        sections[section] = value
+    return sections
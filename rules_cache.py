@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_MACHINES = 32
+MACHINE_TYPES = ('dfa', 'nfa', 'pda', 'tm')
+
+
+def parse_machine(machine_type, rules_file):
+    """Parses a rules file into the machine object for machine_type."""
+    if machine_type == 'dfa':
+        from dfa import parse_dfa_json
+        return parse_dfa_json(rules_file)
+    if machine_type == 'nfa':
+        from nfa import parse_nfa_json
+        return parse_nfa_json(rules_file)
+    if machine_type == 'pda':
+        from pda import parse_pda_json
+        return parse_pda_json(rules_file)
+    if machine_type == 'tm':
+        from tm import parse_tm_json
+        return parse_tm_json(rules_file)
+    raise ValueError(f"Unsupported machine type: {machine_type}")
+
+
+class MachineCache:
+    """
+    A thread-safe, size-bounded LRU cache of parsed machines.
+
+    Entries are keyed by machine type, absolute path, modification time and
+    size, so editing a rules file makes the next lookup parse it again. When
+    several threads ask for the same missing machine at once, only one of
+    them parses it and the others wait for the result.
+
+    Cached machines are shared. DFA, NFA and PDA simulation does not change
+    the machine, but TuringMachine.simulate keeps its tape on the instance,
+    so callers running Turing machines from several threads need their own
+    copies.
+    """
+
+    def __init__(self, max_machines=DEFAULT_MAX_MACHINES, parser=parse_machine):
+        if max_machines < 1:
+            raise ValueError("max_machines must be at least 1")
+        self.max_machines = max_machines
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+        self._machines = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(machine_type, rules_file):
+        path = os.path.abspath(rules_file)
+        stat = os.stat(path)
+        return (machine_type, path, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, machine_type, rules_file):
+        if machine_type not in MACHINE_TYPES:
+            raise ValueError(f"Unsupported machine type: {machine_type}")
+        key = self._key(machine_type, rules_file)
+
+        with self._lock:
+            if key in self._machines:
+                self._machines.move_to_end(key)
+                self.hits += 1
+                return self._machines[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._machines:
+                    self._machines.move_to_end(key)
+                    self.hits += 1
+                    return self._machines[key]
+
+            try:
+                machine = self.parser(machine_type, rules_file)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+
+            with self._lock:
+                self._loading.pop(key, None)
+                self.misses += 1
+                # Older versions of the same file can never be hit again.
+                for stale in [k for k in self._machines if k[:2] == key[:2]]:
+                    del self._machines[stale]
+                self._machines[key] = machine
+                while len(self._machines) > self.max_machines:
+                    self._machines.popitem(last=False)
+            return machine
+
+    def clear(self):
+        with self._lock:
+            self._machines.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._machines)
+
+
+_default_cache = MachineCache()
+
+
+def get_machine(machine_type, rules_file):
+    """Returns a parsed machine from the process-wide cache."""
+    return _default_cache.get(machine_type, rules_file)
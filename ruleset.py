@@ -0,0 +1,206 @@
+import argparse
+import json
+import sys
+from rules_cache import parse_machine
+
+DEFAULT_MAX_PRODUCT_STATES = 10000
+RULE_TYPES = ('dfa', 'nfa')
+
+
+def _dfa_rows(dfa, offset):
+    """The DFA as bitset rows: symbol -> successor bit of each of its states."""
+    rows = {}
+    for (curr, symbol), next_state in dfa.transitions.items():
+        # DFA.simulate rejects symbols outside the alphabet, whatever the
+        # transitions say.
+        if symbol not in dfa.symbol_ids:
+            continue
+        row = rows.setdefault(symbol, [0] * len(dfa.state_names))
+        row[dfa.state_ids[curr]] = 1 << (offset + dfa.state_ids[next_state])
+    final_mask = 0
+    for state in dfa.final_states:
+        if state in dfa.state_ids:
+            final_mask |= 1 << (offset + dfa.state_ids[state])
+    return rows, len(dfa.state_names), 1 << offset, final_mask
+
+
+def _nfa_rows(nfa, offset):
+    """The NFA's precompiled symbol_masks, moved up by offset bits."""
+    rows = {symbol: [mask << offset for mask in row]
+            for symbol, row in nfa.symbol_masks.items()}
+    return rows, len(nfa.state_ids), nfa.start_mask << offset, nfa.final_mask << offset
+
+
+class RuleSet:
+    """
+    Matches an input against many DFA and NFA rule sets in one pass.
+
+    The rules are laid side by side in a single bitset automaton, each one
+    owning a disjoint range of bits, so one step advances every rule at once
+    and a rule whose bits all go to zero has stopped matching. Each distinct
+    combined state (an int mask) is a state of the union automaton. Those
+    states and their transitions are built lazily, the first time an input
+    reaches them, and every state is tagged with the ids of the rules that
+    accept there.
+
+    At most max_product_states union states are kept. Once the table is
+    full it stops growing, and inputs that reach states outside it are
+    finished by stepping each rule's bits directly, without caching. Those
+    per-rule steps are counted in fallback_steps.
+    """
+
+    def __init__(self, rules, max_product_states=DEFAULT_MAX_PRODUCT_STATES):
+        if max_product_states < 1:
+            raise ValueError("max_product_states must be at least 1")
+        self.rules = dict(rules)
+        if not self.rules:
+            raise ValueError("A rule set needs at least one rule")
+        self.max_product_states = max_product_states
+        self.compile()
+
+    def compile(self):
+        self.rule_ids = []
+        self.final_masks = []
+        self.symbol_rows = {}
+        self.start_mask = 0
+        offset = 0
+        for rule_id, machine in self.rules.items():
+            if hasattr(machine, 'symbol_masks'):
+                rows, width, start_mask, final_mask = _nfa_rows(machine, offset)
+            elif hasattr(machine, 'state_names'):
+                rows, width, start_mask, final_mask = _dfa_rows(machine, offset)
+            else:
+                raise ValueError(f"Rule '{rule_id}' is not a DFA or an NFA")
+            for symbol, row in rows.items():
+                combined = self.symbol_rows.setdefault(symbol, [])
+                combined.extend([0] * (offset - len(combined)))
+                combined.extend(row)
+            self.rule_ids.append(rule_id)
+            self.final_masks.append(final_mask)
+            self.start_mask |= start_mask
+            offset += width
+        for row in self.symbol_rows.values():
+            row.extend([0] * (offset - len(row)))
+        self.num_bits = offset
+        self.clear_cache()
+        return self
+
+    def clear_cache(self):
+        """Drops every union state built so far."""
+        self._transitions = {}
+        self._accepts = {}
+        self.fallback_steps = 0
+
+    def _advance(self, mask, symbol):
+        row = self.symbol_rows.get(symbol)
+        if row is None:
+            return 0
+        next_mask = 0
+        while mask:
+            lowest = mask & -mask
+            next_mask |= row[lowest.bit_length() - 1]
+            mask ^= lowest
+        return next_mask
+
+    def _accepting(self, mask):
+        accepts = self._accepts.get(mask)
+        if accepts is None:
+            accepts = tuple(rule_id for rule_id, final_mask in zip(self.rule_ids, self.final_masks)
+                            if mask & final_mask)
+            if len(self._accepts) < self.max_product_states:
+                self._accepts[mask] = accepts
+        return accepts
+
+    def match(self, input_string):
+        """Returns the ids of every rule that accepts input_string, in rule order."""
+        if isinstance(input_string, (bytes, bytearray, memoryview)):
+            input_string = bytes(input_string).decode('latin-1')
+
+        transitions = self._transitions
+        mask = self.start_mask
+        row = transitions.get(mask)
+        if row is None and len(transitions) < self.max_product_states:
+            row = transitions[mask] = {}
+
+        for position, symbol in enumerate(input_string):
+            if row is None:
+                return self._match_uncached(mask, input_string, position)
+            next_mask = row.get(symbol)
+            if next_mask is None:
+                next_mask = row[symbol] = self._advance(mask, symbol)
+            if not next_mask:
+                return ()
+            mask = next_mask
+            row = transitions.get(mask)
+            if row is None and len(transitions) < self.max_product_states:
+                row = transitions[mask] = {}
+
+        return self._accepting(mask)
+
+    def _match_uncached(self, mask, input_string, position):
+        # The union table is full: carry on rule by rule from here.
+        advance = self._advance
+        for symbol in input_string[position:]:
+            mask = advance(mask, symbol)
+            self.fallback_steps += 1
+            if not mask:
+                return ()
+        return self._accepting(mask)
+
+    def match_many(self, strings):
+        return [self.match(s) for s in strings]
+
+    def __len__(self):
+        return len(self._transitions)
+
+
+def _parse_rule(spec):
+    """Parses [rule_id=]type:rules_file; the rule id defaults to the file name."""
+    rule_id, _, rest = spec.rpartition('=')
+    machine_type, sep, rules_file = rest.partition(':')
+    machine_type = machine_type.lower()
+    if not sep or machine_type not in RULE_TYPES:
+        raise ValueError(f"Rule spec must look like [id=]dfa:rules_file or [id=]nfa:rules_file, got '{spec}'")
+    return rule_id or rules_file, (machine_type, rules_file)
+
+
+def load_ruleset(specs, max_product_states=DEFAULT_MAX_PRODUCT_STATES):
+    """Builds a RuleSet from {rule_id: (machine_type, rules_file)}."""
+    rules = {}
+    for rule_id, (machine_type, rules_file) in specs.items():
+        if machine_type not in RULE_TYPES:
+            raise ValueError(f"Rule '{rule_id}' must be a DFA or an NFA, got '{machine_type}'")
+        rules[rule_id] = parse_machine(machine_type, rules_file)
+    return RuleSet(rules, max_product_states)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report which of several DFA/NFA rule files accept each input, in one pass per input.")
+    parser.add_argument('rules', nargs='+',
+                        help="rule files, as [id=]type:rules_file (e.g. even=dfa:dfa_rules.fa)")
+    parser.add_argument('-i', '--input', action='append', default=[], help="an input string to match")
+    parser.add_argument('-f', '--input-file', help="file with one input string per line ('-' for stdin)")
+    parser.add_argument('--max-product-states', type=int, default=DEFAULT_MAX_PRODUCT_STATES,
+                        help="most union states to keep before matching rule by rule")
+    args = parser.parse_args(argv)
+
+    ruleset = load_ruleset(dict(_parse_rule(spec) for spec in args.rules), args.max_product_states)
+    strings = list(args.input)
+    if args.input_file:
+        with (sys.stdin if args.input_file == '-' else open(args.input_file)) as f:
+            strings.extend(line.rstrip('\r\n') for line in f)
+
+    for string in strings:
+        print(json.dumps({"input": string, "matches": list(ruleset.match(string))}))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,168 @@
+import sys
+
+LEFTMOST_LONGEST = "leftmost-longest"
+ALL_ENDS = "all"
+SCAN_MODES = (LEFTMOST_LONGEST, ALL_ENDS)
+
+
+def _inject(threads, start_states, position):
+    for state in start_states:
+        if state not in threads:
+            threads[state] = position
+
+
+def _advance(threads, step, symbol, position):
+    next_threads = {}
+    for state, start in threads.items():
+        for next_state in step(state, symbol):
+            if start < next_threads.get(next_state, position):
+                next_threads[next_state] = start
+    return next_threads
+
+
+def _earliest_accepted(threads, is_accepting):
+    accepted_start = None
+    for state, start in threads.items():
+        if is_accepting(state) and (accepted_start is None or start < accepted_start):
+            accepted_start = start
+    return accepted_start
+
+
+def scan_threads(start_states, step, is_accepting, symbols, mode=LEFTMOST_LONGEST):
+    """
+    Finds the non-empty substrings accepted by an automaton in a single pass.
+
+    This runs the automaton with an extra self-looping start state: a fresh
+    copy of start_states is injected at every position, and each active state
+    remembers the earliest position it was started from. Two runs in the same
+    state behave identically from then on, so only the earliest start is kept
+    and the working set is at most one run per state.
+
+    step(state, symbol) returns the successor states and is_accepting(state)
+    tells whether a state is final. Returns a list of (start, end) offsets:
+
+    - LEFTMOST_LONGEST: non-overlapping matches, each one the leftmost and
+      then longest match starting at or after the end of the previous one.
+    - ALL_ENDS: one match for every end offset at which some substring is
+      accepted, paired with the earliest start for that end.
+    """
+    if mode not in SCAN_MODES:
+        raise ValueError(f"Unknown scan mode: {mode}")
+    if mode == ALL_ENDS:
+        return _scan_all_ends(start_states, step, is_accepting, symbols)
+
+    # While a match is waiting to see whether it can still grow, runs started
+    # after its current end belong to the search for the next match and must
+    # not be merged with it. Each level holds one such search; a new level is
+    # opened at the end of every pending match. A level whose runs have all
+    # died hands its match, and the matches settled after it, to the level
+    # above as tails, which are final unless that level's match grows.
+    levels = [{}]
+    bests = [None]
+    tails = [[]]
+    matches = []
+    _inject(levels[0], start_states, 0)
+
+    position = 0
+    for symbol in symbols:
+        position += 1
+        # A run in a state some shallower level already has started later,
+        # and that level's match would replace this level anyway, so it is
+        # dropped. The levels then hold at most one run per state between
+        # them.
+        active = set()
+        advanced = []
+        for threads in levels:
+            threads = _advance(threads, step, symbol, position)
+            for state in active.intersection(threads):
+                del threads[state]
+            active.update(threads)
+            advanced.append(threads)
+        levels = advanced
+
+        for k, threads in enumerate(levels):
+            accepted_start = _earliest_accepted(threads, is_accepting)
+            if accepted_start is None:
+                continue
+            if bests[k] is not None and accepted_start > bests[k][0]:
+                continue
+            bests[k] = (accepted_start, position)
+            # Runs started after the match began can only overlap it.
+            levels[k] = {state: start for state, start in threads.items()
+                         if start <= accepted_start}
+            del levels[k + 1:], bests[k + 1:], tails[k + 1:]
+            tails[k] = []
+            levels.append({})
+            bests.append(None)
+            tails.append([])
+            break
+
+        for k in range(len(levels) - 2, 0, -1):
+            if not levels[k]:
+                tails[k - 1].append(bests[k])
+                tails[k - 1].extend(tails[k])
+                del levels[k], bests[k], tails[k]
+
+        # A pending match is final once no run that could replace it is alive.
+        if bests[0] is not None and not levels[0]:
+            matches.append(bests[0])
+            matches.extend(tails[0])
+            del levels[0], bests[0], tails[0]
+
+        _inject(levels[-1], start_states, position)
+
+    for best, settled in zip(bests, tails):
+        if best is not None:
+            matches.append(best)
+            matches.extend(settled)
+    return matches
+
+
+def _scan_all_ends(start_states, step, is_accepting, symbols):
+    matches = []
+    threads = {}
+    _inject(threads, start_states, 0)
+
+    position = 0
+    for symbol in symbols:
+        position += 1
+        threads = _advance(threads, step, symbol, position)
+        accepted_start = _earliest_accepted(threads, is_accepting)
+        if accepted_start is not None:
+            matches.append((accepted_start, position))
+        _inject(threads, start_states, position)
+    return matches
+
+
+if __name__ == '__main__':
+    try:
+        if len(sys.argv) >= 4:
+            machine_type = sys.argv[1].lower()
+            rules_file = sys.argv[2]
+            input_file = sys.argv[3]
+        else:
+            machine_type = input("Input the machine type (dfa, nfa): ").lower()
+            rules_file = input("Input your rule filename: ")
+            input_file = input("Input the file to scan: ")
+        mode = sys.argv[4] if len(sys.argv) >= 5 else LEFTMOST_LONGEST
+
+        if machine_type == 'dfa':
+            from dfa import parse_dfa_json as parse
+        elif machine_type == 'nfa':
+            from nfa import parse_nfa_json as parse
+        else:
+            raise ValueError(f"Unsupported machine type: {machine_type}")
+
+        machine = parse(rules_file)
+        with open(input_file) as f:
+            text = f.read()
+
+        for start, end in machine.scan(text, mode):
+            print(f"{start}\t{end}\t{text[start:end]}")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from batch import DEFAULT_STEP_LIMIT, run_chunk
+from rules_cache import MACHINE_TYPES, parse_machine
+
+DEFAULT_MAX_BATCH = 1024
+DEFAULT_MAX_DELAY = 0.002
+# Longest request line accepted, in bytes; asyncio's own default is 64 KiB.
+DEFAULT_LINE_LIMIT = 16 * 1024 * 1024
+# Machine types whose simulation can run long enough to stall the event loop.
+OFFLOADED_TYPES = ('pda', 'tm')
+
+# Set once per worker process by _init_worker.
+_machines = {}
+
+
+def _init_worker(specs):
+    global _machines
+    _machines = {name: (machine_type, parse_machine(machine_type, rules_file))
+                 for name, (machine_type, rules_file) in specs.items()}
+
+
+def _run_worker_batch(name, strings, step_limit, detect_loops):
+    machine_type, machine = _machines[name]
+    return run_chunk(machine, machine_type, strings, step_limit, detect_loops)
+
+
+class MachineStats:
+    """Request, latency and throughput counters for one loaded machine."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.inputs = 0
+        self.batches = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, inputs, latency):
+        self.requests += 1
+        self.inputs += inputs
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self):
+        uptime = time.monotonic() - self.started
+        return {
+            "requests": self.requests,
+            "inputs": self.inputs,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_latency_ms": 1000 * self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency_ms": 1000 * self.max_latency,
+            "inputs_per_second": self.inputs / uptime if uptime > 0 else 0.0,
+        }
+
+
+class AutomatonServer:
+    """
+    Serves preloaded machines over newline-delimited JSON.
+
+    Requests look like {"id": 1, "machine": "even", "input": "1001"} or use
+    "inputs" with a list of strings; the response echoes the id with a
+    "result" or "results" field, or an "error". {"op": "stats"} returns the
+    per-machine counters and {"op": "machines"} the loaded machines.
+
+    Concurrent requests for the same machine are collected for up to
+    max_delay seconds (or max_batch inputs) and simulated as one batch. DFA
+    and NFA batches (through DFA.simulate_many and NFA.simulate_bitset, see
+    batch.run_chunk) run on the event loop; PDA and Turing machine batches
+    go to a process pool whose workers parse every rules file once.
+    """
+
+    def __init__(self, specs, workers=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY,
+                 step_limit=DEFAULT_STEP_LIMIT, detect_loops=False, line_limit=DEFAULT_LINE_LIMIT):
+        for name, (machine_type, _) in specs.items():
+            if machine_type not in MACHINE_TYPES:
+                raise ValueError(f"Unsupported machine type for '{name}': {machine_type}")
+        self.specs = specs
+        self.machines = {name: parse_machine(machine_type, rules_file)
+                         for name, (machine_type, rules_file) in specs.items()}
+        self.stats = {name: MachineStats() for name in specs}
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.step_limit = step_limit
+        self.detect_loops = detect_loops
+        self.line_limit = line_limit
+
+        self.pool = None
+        if any(machine_type in OFFLOADED_TYPES for machine_type, _ in specs.values()):
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(specs,))
+        self._queues = {}
+        self._batchers = []
+        self._clients = {}
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=0, unix_path=None):
+        for name in self.specs:
+            self._queues[name] = asyncio.Queue()
+            self._batchers.append(asyncio.create_task(self._batcher(name)))
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, unix_path,
+                                                          limit=self.line_limit)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port,
+                                                     limit=self.line_limit)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        # Closing a connection ends its handler once in-flight requests finish.
+        clients = list(self._clients.items())
+        for _, writer in clients:
+            writer.close()
+        await asyncio.gather(*(task for task, _ in clients), return_exceptions=True)
+        for task in self._batchers:
+            task.cancel()
+        await asyncio.gather(*self._batchers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def classify(self, name, strings):
+        if name not in self.machines:
+            raise ValueError(f"Unknown machine: {name}")
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[name].put((strings, future, time.monotonic()))
+        return await future
+
+    async def _batcher(self, name):
+        queue = self._queues[name]
+        loop = asyncio.get_running_loop()
+        machine_type = self.specs[name][0]
+        stats = self.stats[name]
+
+        while True:
+            pending = [await queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_delay
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            strings = [s for item in pending for s in item[0]]
+            try:
+                if machine_type in OFFLOADED_TYPES:
+                    results = await loop.run_in_executor(
+                        self.pool, _run_worker_batch, name, strings, self.step_limit, self.detect_loops)
+                else:
+                    results = run_chunk(self.machines[name], machine_type, strings,
+                                        self.step_limit, self.detect_loops)
+            except Exception as e:
+                stats.errors += len(pending)
+                for _, future, _ in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            stats.batches += 1
+            now = time.monotonic()
+            offset = 0
+            for request_strings, future, enqueued in pending:
+                count = len(request_strings)
+                stats.record(count, now - enqueued)
+                if not future.done():
+                    future.set_result(results[offset:offset + count])
+                offset += count
+
+    async def _respond(self, request, writer):
+        response = {"id": request.get("id")} if isinstance(request, dict) else {}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            op = request.get("op", "classify")
+            if op == "stats":
+                response["stats"] = {name: s.as_dict() for name, s in self.stats.items()}
+            elif op == "machines":
+                response["machines"] = {name: machine_type for name, (machine_type, _) in self.specs.items()}
+            elif op == "classify":
+                if "inputs" in request:
+                    if not isinstance(request["inputs"], list) or \
+                            not all(isinstance(s, str) for s in request["inputs"]):
+                        raise ValueError("inputs must be a list of strings")
+                    response["results"] = await self.classify(request.get("machine"), request["inputs"])
+                elif isinstance(request.get("input"), str):
+                    response["result"] = (await self.classify(request.get("machine"), [request["input"]]))[0]
+                else:
+                    raise ValueError("Request needs an input string or an inputs list")
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            response["error"] = str(e)
+
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def _handle_client(self, reader, writer):
+        self._clients[asyncio.current_task()] = writer
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial
+                except asyncio.LimitOverrunError:
+                    # One reply for the whole overlong line, then carry on
+                    # with the next one.
+                    await _skip_line(reader)
+                    writer.write((json.dumps(
+                        {"error": f"Request line longer than {self.line_limit} bytes"}) + "\n").encode())
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    # Covers malformed JSON and bytes that are not valid UTF-8.
+                    writer.write((json.dumps({"error": f"Invalid JSON: {e}"}) + "\n").encode())
+                    await writer.drain()
+                    continue
+                # Requests on one connection are answered as they finish,
+                # so several can share a batch.
+                task = asyncio.create_task(self._respond(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self._clients.pop(asyncio.current_task(), None)
+            writer.close()
+
+
+async def _skip_line(reader):
+    """Discards input up to and including the next newline, or to EOF."""
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.IncompleteReadError:
+            return
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+
+
+def _parse_spec(spec):
+    """Parses name=type:rules_file."""
+    try:
+        name, rest = spec.split('=', 1)
+        machine_type, rules_file = rest.split(':', 1)
+    except ValueError:
+        raise ValueError(f"Machine spec must look like name=type:rules_file, got '{spec}'")
+    return name, (machine_type.lower(), rules_file)
+
+
+async def _serve(args):
+    specs = dict(_parse_spec(spec) for spec in args.machine)
+    server = AutomatonServer(specs, args.workers, args.max_batch, args.max_delay / 1000,
+                             args.step_limit, args.detect_loops, args.line_limit)
+    listener = await server.start(args.host, args.port, args.unix)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Serving {', '.join(specs)} on {addresses}", file=sys.stderr)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve preloaded automata over newline-delimited JSON.")
+    parser.add_argument('machine', nargs='+',
+                        help="machines to load, as name=type:rules_file (e.g. even=dfa:dfa_rules.fa)")
+    parser.add_argument('--unix', help="listen on this Unix domain socket instead of TCP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7878)
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes for PDA and Turing machine batches")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="most inputs simulated in one batch")
+    parser.add_argument('--max-delay', type=float, default=DEFAULT_MAX_DELAY * 1000,
+                        help="milliseconds to wait for more requests before running a batch")
+    parser.add_argument('--step-limit', type=int, default=DEFAULT_STEP_LIMIT,
+                        help="per-string step limit for Turing machines")
+    parser.add_argument('--line-limit', type=int, default=DEFAULT_LINE_LIMIT,
+                        help="longest request line accepted, in bytes")
+    parser.add_argument('--detect-loops', action='store_true',
+                        help="report Turing machines that provably never halt as Looping")
+    args = parser.parse_args(argv)
+    asyncio.run(_serve(args))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,67 @@
+import mmap
+import sys
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def match_stream(matcher, source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Feeds a matcher from anything with a read(n) method (file objects,
+    sockets wrapped with makefile(), mmap objects) in fixed-size chunks.
+    Stops reading as soon as the machine reaches a dead state.
+    Returns whether the input consumed so far is accepted.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    while not matcher.is_dead():
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        matcher.feed(chunk)
+    return matcher.is_accepting()
+
+
+def match_file(matcher, path, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=True):
+    """Runs match_stream over a file, memory-mapping it when possible."""
+    with open(path, 'rb') as f:
+        if use_mmap:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return match_stream(matcher, mapped, chunk_size)
+            except ValueError:
+                # Empty files cannot be mapped.
+                pass
+        return match_stream(matcher, f, chunk_size)
+
+
+if __name__ == '__main__':
+    try:
+        if len(sys.argv) >= 4:
+            machine_type = sys.argv[1].lower()
+            rules_file = sys.argv[2]
+            input_file = sys.argv[3]
+        else:
+            machine_type = input("Input the machine type (dfa, nfa, pda): ").lower()
+            rules_file = input("Input your rule filename: ")
+            input_file = input("Input the file to read the input from: ")
+
+        if machine_type == 'dfa':
+            from dfa import parse_dfa_json as parse
+        elif machine_type == 'nfa':
+            from nfa import parse_nfa_json as parse
+        elif machine_type == 'pda':
+            from pda import parse_pda_json as parse
+        else:
+            raise ValueError(f"Unsupported machine type: {machine_type}")
+
+        result = match_file(parse(rules_file).matcher(), input_file)
+        print(
+            f"The contents of \"{input_file}\" parsed through the {machine_type.upper()} emulator return: {'Accepted' if result else 'Rejected'}")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
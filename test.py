@@ -1,8 +1,27 @@
 import sys
-from dfa import parse_dfa_json
+import asyncio
+import json
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from dfa import DFA, minimize_dfa, parse_dfa_json
 from nfa import parse_nfa_json
-from pda import parse_pda_json
-from tm import parse_tm_json
+from pda import PDA, epsilon_summaries, parse_pda_json
+from tm import TuringMachine, parse_tm_json
+from convert import nfa_to_dfa, nfa_to_minimal_dfa
+from equivalence import equivalent, included
+from stream import match_stream
+from parallel import simulate_file_parallel
+from batch import run_batch
+from compiled_rules import load_compiled
+from read_file import ArrayStream, iter_rules, load_rules
+from rules_cache import MachineCache
+from ruleset import RuleSet
+from server import AutomatonServer
+from profiling import Profile, profile_machine
 
 
 def run_tests():
@@ -24,6 +43,23 @@ def run_tests():
             status = "PASS" if result == expected else "FAIL"
             print(
                 f"DFA Test '{string}': {'Accepted' if result else 'Rejected'} (Expected: {'Accepted' if expected else 'Rejected'}) - {status}")
+
+        # Compiled table must agree with the dictionary-based reference path
+        samples = ["".join(p) for n in range(7)
+                   for p in itertools.product("012", repeat=n)]
+        mismatches = [s for s in samples
+                      if dfa.simulate(s) != dfa.simulate_reference(s)
+                      or dfa.simulate(s.encode()) != dfa.simulate_reference(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"DFA Test compiled vs reference ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        # Chunks hold at most 100 symbols; the long strings skip them
+        strings = samples[:500] + ["1001" * 50, "1001" * 50 + "0"] + samples[500:]
+        batch = dfa.simulate_many(strings, chunk_size=100)
+        status = "PASS" if batch == [dfa.simulate(s) for s in strings] and type(batch) is list else "FAIL"
+        print(
+            f"DFA Test simulate_many ({len(strings)} strings) - {status}")
     except Exception as e:
         print(f"DFA test failed with error: {e}", file=sys.stderr)
     print("-" * 20)
@@ -45,6 +81,21 @@ def run_tests():
             status = "PASS" if result == expected else "FAIL"
             print(
                 f"NFA Test '{string}': {'Accepted' if result else 'Rejected'} (Expected: {'Accepted' if expected else 'Rejected'}) - {status}")
+
+        samples = ["".join(p) for n in range(7)
+                   for p in itertools.product("012", repeat=n)]
+        mismatches = [s for s in samples
+                      if nfa.simulate_bitset(s) != nfa.simulate(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"NFA Test bitset simulation ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        nfa.max_cached_states = 2
+        mismatches = [s for s in samples
+                      if nfa.simulate_lazy(s) != nfa.simulate(s)]
+        status = "PASS" if not mismatches and nfa.cache_flushes > 0 else "FAIL"
+        print(
+            f"NFA Test lazy DFA cache ({len(samples)} strings, {nfa.cache_flushes} flushes): {len(mismatches)} mismatches - {status}")
     except Exception as e:
         print(f"NFA test failed with error: {e}", file=sys.stderr)
     print("-" * 20)
@@ -66,10 +117,481 @@ def run_tests():
             status = "PASS" if result == expected else "FAIL"
             print(
                 f"PDA Test '{string}': {'Accepted' if result else 'Rejected'} (Expected: {'Accepted' if expected else 'Rejected'}) - {status}")
+
+        reference = parse_pda_json('pda_rules.fa')
+        reference.stack_mode = "tuple"
+        samples = ["".join(p) for n in range(9)
+                   for p in itertools.product("01", repeat=n)]
+        mismatches = [s for s in samples
+                      if pda.simulate(s) != reference.simulate(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"PDA Test deterministic engine vs tuple stack ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        # Even-length palindromes: the machine has to guess the middle.
+        palindromes = {("p", a, top): {("p", a + top)} for a in "01" for top in "Z01"}
+        palindromes.update({("p", "", top): {("q", top)} for top in "Z01"})
+        palindromes.update({("q", a, a): {("q", "")} for a in "01"})
+        palindromes[("q", "", "Z")] = {("f", "Z")}
+        machines = [PDA(["p", "q", "f"], ["0", "1"], ["Z", "0", "1"], palindromes,
+                        "p", "Z", ["f"], stack_mode=mode) for mode in ("persistent", "tuple")]
+        mismatches = [s for s in samples if machines[0].simulate(s) != machines[1].simulate(s)
+                      or machines[0].simulate(s) != (len(s) % 2 == 0 and s == s[::-1])]
+        engines = [pda.selected_engine, machines[0].selected_engine]
+        status = "PASS" if not mismatches and engines == ["deterministic", "search"] else "FAIL"
+        print(
+            f"PDA Test persistent vs tuple stack on palindromes ({len(samples)} strings, engines {engines}): "
+            f"{len(mismatches)} mismatches - {status}")
+
+        earley = parse_pda_json('pda_rules.fa')
+        earley.engine = "earley"
+        mismatches = [s for s in samples
+                      if pda.simulate(s) != earley.simulate(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"PDA Test Earley engine vs search ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        gss = parse_pda_json('pda_rules.fa')
+        gss.stack_mode = "gss"
+        mismatches = [s for s in samples
+                      if pda.simulate(s) != gss.simulate(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"PDA Test graph-structured stack vs search ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        # Guesses A or B on every x, so there are 2^n distinct stacks, then
+        # pops everything; an epsilon push cycle on p can grow the stack forever.
+        guessing = PDA(
+            ["p", "e", "f"], ["x"], ["Z", "A", "B"],
+            {("p", "x", "Z"): {("p", "AZ"), ("p", "BZ")}, ("p", "x", "A"): {("p", "AA"), ("p", "BA")},
+             ("p", "x", "B"): {("p", "AB"), ("p", "BB")}, ("p", "", "A"): {("e", ""), ("p", "AA")},
+             ("p", "", "B"): {("e", "")}, ("e", "", "A"): {("e", "")}, ("e", "", "B"): {("e", "")},
+             ("e", "", "Z"): {("f", "")}},
+            "p", "Z", ["f"], stack_mode="gss")
+        result = guessing.simulate("x" * 60)
+        status = "PASS" if result else "FAIL"
+        print(f"PDA Test graph-structured stack on 2^60 stacks and an epsilon push cycle: {result} - {status}")
+
+        replacements, pops, unbounded = epsilon_summaries(guessing.transitions)
+        summarised = PDA(guessing.states, guessing.input_alphabet, guessing.stack_alphabet,
+                         guessing.transitions, "p", "Z", ["f"])
+        results = [summarised.simulate(s) for s in ("x" * 20, "")]
+        status = "PASS" if unbounded == {("p", "A")} and pops[("p", "A")] == {"e"} \
+            and results == [True, False] else "FAIL"
+        print(f"PDA Test epsilon summaries find the unbounded push: {sorted(unbounded)}, {results} - {status}")
+
+        guessing.set_limits(max_configurations=50)
+        result = guessing.decide("x" * 60)
+        status = "PASS" if result == "Undecided (Configuration limit reached)" else "FAIL"
+        print(f"PDA Test configuration cap: {result} - {status}")
+
+        gss.set_limits(max_stack_depth=3)
+        results = [gss.decide(s) for s in ("01", "000111", "10")]
+        expected = ["Accepted", "Undecided (Stack depth limit reached)", "Rejected"]
+        status = "PASS" if results == expected else "FAIL"
+        print(f"PDA Test stack depth cap: {results} (Expected: {expected}) - {status}")
     except Exception as e:
         print(f"PDA test failed with error: {e}", file=sys.stderr)
     print("-" * 20)
 
+    # --- NFA to DFA Conversion Tests ---
+    print("--- Testing NFA to DFA Conversion ---")
+    try:
+        nfa = parse_nfa_json('nfa_rules.fa')
+        dfa, stats = nfa_to_minimal_dfa(nfa)
+        samples = ["".join(p) for n in range(8)
+                   for p in itertools.product("01", repeat=n)]
+        mismatches = [s for s in samples if dfa.simulate(s) != nfa.simulate(s)]
+        status = "PASS" if not mismatches and stats["minimal_dfa_states"] == 3 else "FAIL"
+        print(
+            f"Conversion Test nfa_rules.fa ({stats['nfa_states']} -> {stats['dfa_states']} -> {stats['minimal_dfa_states']} states): {len(mismatches)} mismatches - {status}")
+
+        # A 16000-state chain splits one state off per refinement; the two
+        # non-accepting sink states merge with the implicit dead state
+        n = 16000
+        chain_transitions = {(f"q{i}", "a"): f"q{i + 1}" for i in range(n)}
+        chain_transitions.update({(f"q{i}", "b"): "sink1" for i in range(n)})
+        chain_transitions.update({("sink1", "a"): "sink2", ("sink2", "a"): "sink1"})
+        chain = DFA([f"q{i}" for i in range(n + 1)] + ["sink1", "sink2"], ["a", "b"],
+                    chain_transitions, "q0", [f"q{n}"])
+        started = time.perf_counter()
+        minimal = minimize_dfa(chain)
+        elapsed = time.perf_counter() - started
+        status = "PASS" if len(minimal.states) == n + 1 and elapsed < 5 else "FAIL"
+        print(f"Conversion Test minimizing a {n}-state chain: {len(minimal.states)} states in {elapsed:.2f}s - {status}")
+    except Exception as e:
+        print(f"Conversion test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Equivalence Tests ---
+    print("--- Testing Equivalence ---")
+    try:
+        nfa = parse_nfa_json('nfa_rules.fa')
+        dfa, _ = nfa_to_minimal_dfa(nfa)
+        even = parse_dfa_json('dfa_rules.fa')
+        checks = [
+            ("NFA vs its minimal DFA", equivalent(nfa, dfa), True, None),
+            ("subset-construction DFA vs minimal DFA (Hopcroft-Karp)", equivalent(nfa_to_dfa(nfa), dfa), True, None),
+            ("NFA vs even-zeros DFA", equivalent(nfa, even), False, ""),
+            ("even-zeros DFA vs minimal DFA (Hopcroft-Karp)", equivalent(even, dfa), False, ""),
+            ("NFA included in even-zeros DFA", included(nfa, even), False, "01"),
+        ]
+        for name, result, holds, counterexample in checks:
+            status = "PASS" if bool(result) == holds and result.counterexample == counterexample else "FAIL"
+            print(f"Equivalence Test {name}: {result} - {status}")
+    except Exception as e:
+        print(f"Equivalence test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Scan Tests ---
+    print("--- Testing Scan ---")
+    try:
+        nfa = parse_nfa_json('nfa_rules.fa')
+        scan_test_cases = {
+            ("1101x0011001", "leftmost-longest"): [(0, 4), (5, 12)],
+            ("1101x0011001", "all"): [(0, 4), (5, 8), (5, 12)],
+            ("1110", "leftmost-longest"): [],
+        }
+        for (text, mode), expected in scan_test_cases.items():
+            result = nfa.scan(text, mode)
+            status = "PASS" if result == expected else "FAIL"
+            print(
+                f"Scan Test NFA '{text}' ({mode}): {result} (Expected: {expected}) - {status}")
+
+        dfa = parse_dfa_json('dfa_rules.fa')
+        result = dfa.scan("1001x100")
+        expected = [(0, 4), (5, 8)]
+        status = "PASS" if result == expected else "FAIL"
+        print(
+            f"Scan Test DFA '1001x100' (leftmost-longest): {result} (Expected: {expected}) - {status}")
+
+        # "a" | "a+x": every "a" is a match that stays pending until an "x"
+        # might turn up, so the pending searches must not pile up
+        pending = DFA(["s", "a", "p", "x"], ["a", "x"],
+                      {("s", "a"): "a", ("a", "a"): "p", ("a", "x"): "x",
+                       ("p", "a"): "p", ("p", "x"): "x"}, "s", ["a", "x"])
+        results = [pending.scan("a" * 16000), pending.scan("a" * 16000 + "x")]
+        expected = [[(i, i + 1) for i in range(16000)], [(0, 16001)]]
+        status = "PASS" if results == expected else "FAIL"
+        print(f"Scan Test long pending match over 16000 symbols: {[len(r) for r in results]} matches - {status}")
+    except Exception as e:
+        print(f"Scan test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Rule Set Tests ---
+    print("--- Testing Rule Sets ---")
+    try:
+        # "2" has a transition but is not in the alphabet, so it is rejected.
+        off_alphabet = DFA(["a", "b"], ["0", "1"],
+                           {("a", "0"): "b", ("b", "1"): "a", ("a", "2"): "a"}, "a", ["a"])
+        rules = {"even": parse_dfa_json('dfa_rules.fa'), "ends01": parse_nfa_json('nfa_rules.fa'),
+                 "off_alphabet": off_alphabet}
+        samples = ["".join(p) for n in range(7)
+                   for p in itertools.product("012", repeat=n)]
+        expected = [tuple(rule_id for rule_id, machine in rules.items() if machine.simulate(s))
+                    for s in samples]
+        for bound in (10000, 2):
+            ruleset = RuleSet(rules, max_product_states=bound)
+            mismatches = [s for s, e in zip(samples, expected) if ruleset.match(s) != e]
+            status = "PASS" if not mismatches and len(ruleset) <= bound else "FAIL"
+            print(
+                f"Rule Set Test union of DFAs and an NFA, bound {bound} ({len(ruleset)} states, "
+                f"{ruleset.fallback_steps} fallback steps): {len(mismatches)} mismatches - {status}")
+    except Exception as e:
+        print(f"Rule set test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Rules Loader Tests ---
+    print("--- Testing Rules Loader ---")
+    try:
+        dfa_rules = load_rules('dfa_rules.fa')
+        tm_rules = load_rules('tm_rules.fa')
+        status = "PASS" if "alphabet" in dfa_rules and "tape_alphabet" not in dfa_rules \
+            and "tape_alphabet" in tm_rules else "FAIL"
+        print(f"Loader Test two rules files stay separate - {status}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            commented = os.path.join(directory, "commented.fa")
+            with open(commented, "w") as f:
+                f.write('{\n  // line comment\n  "states": ["q0", "q//1"], /* block\n comment */\n'
+                        '  "transitions": [{"a": "/*x*/"}, {"b": 2}] // done\n}\n')
+            streamed = {}
+            for section, value in iter_rules(commented, chunk_size=3):
+                streamed[section] = list(value) if isinstance(value, ArrayStream) else value
+            expected = {"states": ["q0", "q//1"], "transitions": [{"a": "/*x*/"}, {"b": 2}]}
+            status = "PASS" if streamed == expected else "FAIL"
+            print(f"Loader Test streaming reader strips comments across chunks - {status}")
+
+            numbers = os.path.join(directory, "numbers.fa")
+            expected = {"n": 0.5, "values": [-2500.0, 1e5, -3, 12.25e-2, 7, 0]}
+            with open(numbers, "w") as f:
+                f.write('{"n": 0.5, "values": [-2500.0, 1e5, -3, 12.25e-2, 7, 0]}')
+            for chunk_size in (1, 2, 4):
+                streamed = {}
+                for section, value in iter_rules(numbers, streamed_sections=('values',), chunk_size=chunk_size):
+                    streamed[section] = list(value) if isinstance(value, ArrayStream) else value
+                status = "PASS" if streamed == expected else "FAIL"
+                print(f"Loader Test numbers split across {chunk_size}-character chunks: {streamed} - {status}")
+
+        cache = MachineCache(max_machines=2)
+        first = cache.get('dfa', 'dfa_rules.fa')
+        second = cache.get('dfa', 'dfa_rules.fa')
+        cache.get('nfa', 'nfa_rules.fa')
+        cache.get('pda', 'pda_rules.fa')
+        status = "PASS" if first is second and cache.hits == 1 and len(cache) == 2 else "FAIL"
+        print(
+            f"Loader Test machine cache (hits: {cache.hits}, misses: {cache.misses}, size: {len(cache)}) - {status}")
+    except Exception as e:
+        print(f"Rules loader test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Compiled Rules Tests ---
+    print("--- Testing Compiled Rules ---")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for machine_type, parse, strings in (
+                    ("dfa", parse_dfa_json, ["", "00", "0", "1001"]),
+                    ("tm", parse_tm_json, ["", "012", "001122", "00122"])):
+                rules = os.path.join(directory, f"{machine_type}_rules.fa")
+                shutil.copy(f"{machine_type}_rules.fa", rules)
+                load_compiled(machine_type, rules)
+                loaded = load_compiled(machine_type, rules)
+                expected = [parse(rules).simulate(s) for s in strings]
+                results = [loaded.simulate(s) for s in strings]
+                mapped = isinstance(loaded.table if machine_type == "dfa" else loaded._compiled.next_states, memoryview)
+                status = "PASS" if results == expected and mapped else "FAIL"
+                print(
+                    f"Compiled Test {machine_type.upper()} loaded from artifact: {results} (Expected: {expected}) - {status}")
+
+            # Editing the source must invalidate the artifact
+            rules = os.path.join(directory, "dfa_rules.fa")
+            with open(rules, "a") as f:
+                f.write("\n")
+            reloaded = load_compiled("dfa", rules)
+            status = "PASS" if not isinstance(reloaded.table, memoryview) else "FAIL"
+            print(f"Compiled Test stale artifact is rebuilt - {status}")
+
+            # A truncated or garbled artifact with a valid header is rebuilt too
+            with open(rules + ".compiled", "rb") as f:
+                artifact = f.read()
+            meta_start = artifact.index(b"{")
+            damaged = {"truncated": artifact[:len(artifact) - 16],
+                       "bad metadata": artifact[:meta_start] + b"\xff" + artifact[meta_start + 1:]}
+            for name, data in damaged.items():
+                with open(rules + ".compiled", "wb") as f:
+                    f.write(data)
+                reloaded = load_compiled("dfa", rules)
+                results = [reloaded.simulate(s) for s in ["", "00", "0", "1001"]]
+                status = "PASS" if results == [True, True, False, True] else "FAIL"
+                print(f"Compiled Test {name} artifact is rebuilt: {results} - {status}")
+    except Exception as e:
+        print(f"Compiled rules test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Streaming Matcher Tests ---
+    print("--- Testing Streaming Matchers ---")
+    try:
+        machines = {
+            "DFA": (parse_dfa_json('dfa_rules.fa'), "1001"),
+            "NFA": (parse_nfa_json('nfa_rules.fa'), "11101"),
+            "PDA": (parse_pda_json('pda_rules.fa'), "000111"),
+        }
+        for name, (machine, string) in machines.items():
+            results = [match_stream(machine.matcher(), io.BytesIO(string.encode()), chunk_size)
+                       for chunk_size in (1, 2, len(string))]
+            status = "PASS" if all(results) else "FAIL"
+            print(
+                f"Stream Test {name} '{string}' in 1/2/{len(string)}-byte chunks: {results} - {status}")
+
+        # Feed a common prefix, snapshot, take a diverging suffix, then
+        # restore and take the original suffix
+        branches = {"DFA": ("10", "00", "01"), "NFA": ("111", "10", "01"), "PDA": ("000", "1", "111")}
+        for name, (prefix, diverging, suffix) in branches.items():
+            machine = machines[name][0]
+            matcher = machine.matcher()
+            matcher.feed(prefix.encode())
+            snapshot = matcher.snapshot()
+            matcher.feed(diverging.encode())
+            diverged = matcher.is_accepting()
+            matcher.restore(snapshot)
+            matcher.feed(suffix)
+            results = [diverged, matcher.is_accepting()]
+            expected = [machine.simulate(prefix + diverging), machine.simulate(prefix + suffix)]
+            status = "PASS" if results == expected else "FAIL"
+            print(
+                f"Stream Test {name} snapshot/restore '{prefix}' + '{diverging}' | '{suffix}': {results} (Expected: {expected}) - {status}")
+
+        # Reading stops at the first chunk after which no run is alive
+        dead_inputs = {"DFA": "2", "NFA": "2", "PDA": "1"}
+        for name, start in dead_inputs.items():
+            source = io.BytesIO((start + "0" * 1000).encode())
+            result = match_stream(machines[name][0].matcher(), source, chunk_size=4)
+            status = "PASS" if not result and source.tell() == 4 else "FAIL"
+            print(f"Stream Test {name} stops at a dead state after {source.tell()} of 1001 bytes - {status}")
+
+        dfa = machines["DFA"][0]
+        strings = ["1001" * 500, "1001" * 500 + "0", "10" * 300 + "2" + "0" * 99]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.txt")
+            results = []
+            for string in strings:
+                with open(path, "w") as f:
+                    f.write(string)
+                results.append([simulate_file_parallel(dfa, path, workers, chunks, block_size=64)
+                                for workers, chunks in ((1, 7), (2, 3))])
+        expected = [[dfa.simulate(s)] * 2 for s in strings]
+        status = "PASS" if results == expected else "FAIL"
+        print(f"Stream Test chunk-parallel DFA over a memory-mapped file: {results} - {status}")
+    except Exception as e:
+        print(f"Streaming test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Profiling Tests ---
+    print("--- Testing Profiling ---")
+    try:
+        machines = {
+            "dfa": (parse_dfa_json('dfa_rules.fa'), "012"),
+            "nfa": (parse_nfa_json('nfa_rules.fa'), "012"),
+            "pda": (parse_pda_json('pda_rules.fa'), "01"),
+            "tm": (parse_tm_json('tm_rules.fa'), "012"),
+        }
+        for machine_type, (machine, alphabet) in machines.items():
+            samples = ["".join(p) for n in range(6)
+                       for p in itertools.product(alphabet, repeat=n)]
+            profile = Profile(machine_type)
+            mismatches = [s for s in samples
+                          if machine.simulate_profiled(s, profile) != machine.simulate(s)]
+            dot = profile.to_dot(machine)
+            status = "PASS" if not mismatches and profile.runs == len(samples) \
+                and profile.transition_hits and dot.startswith("digraph") else "FAIL"
+            print(
+                f"Profile Test {machine_type.upper()} ({len(samples)} strings, {profile.steps} steps): {len(mismatches)} mismatches - {status}")
+
+        profile = profile_machine('pda', machines["pda"][0], ["000111"])
+        status = "PASS" if profile.peak_stack_depth == 4 else "FAIL"
+        print(f"Profile Test PDA peak stack depth on '000111': {profile.peak_stack_depth} (Expected: 4) - {status}")
+
+        # An epsilon self-loop that pushes: profiling has to refuse it rather than run forever
+        pushing = PDA(["p", "f"], ["x"], ["Z", "A"],
+                      {("p", "", "Z"): {("p", "AZ")}, ("p", "", "A"): {("p", "AA")},
+                       ("p", "x", "A"): {("f", "A")}},
+                      "p", "Z", ["f"])
+        try:
+            pushing.simulate_profiled("x", Profile("pda"))
+            error = None
+        except ValueError as e:
+            error = str(e)
+        status = "PASS" if error and pushing.simulate("x") else "FAIL"
+        print(f"Profile Test PDA with an unbounded epsilon push is refused: {error} - {status}")
+    except Exception as e:
+        print(f"Profiling test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Batch Runner Tests ---
+    print("--- Testing Batch Runner ---")
+    try:
+        samples = ["".join(bits) for n in range(7) for bits in itertools.product("012", repeat=n)]
+        machines = {"dfa": parse_dfa_json('dfa_rules.fa'), "nfa": parse_nfa_json('nfa_rules.fa')}
+        for (machine_type, machine), workers, ordered in itertools.product(machines.items(), (1, 2), (True, False)):
+            expected = [{"index": i, "input": s, "result": "Accepted" if machine.simulate(s) else "Rejected"}
+                        for i, s in enumerate(samples)]
+            output = io.StringIO()
+            # A small chunk size keeps many chunks queued behind the cap.
+            run_batch(machine_type, f'{machine_type}_rules.fa', [s + "\n" for s in samples], output,
+                      workers=workers, chunk_size=3, ordered=ordered)
+            records = [json.loads(line) for line in output.getvalue().splitlines()]
+            if not ordered:
+                records.sort(key=lambda record: record["index"])
+            status = "PASS" if records == expected else "FAIL"
+            print(f"Batch Test {machine_type.upper()} workers={workers} ordered={ordered}: {len(records)} results - {status}")
+    except Exception as e:
+        print(f"Batch runner test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
+    # --- Server Tests ---
+    print("--- Testing Server ---")
+    try:
+        async def round_trip():
+            server = AutomatonServer({"even": ("dfa", "dfa_rules.fa"), "ends01": ("nfa", "nfa_rules.fa"),
+                                      "tm": ("tm", "tm_rules.fa")},
+                                     workers=1, max_delay=0.01)
+            listener = await server.start()
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                requests = [{"id": i, "machine": "even", "input": s}
+                            for i, s in enumerate(["00", "01010", "1001"])]
+                requests.append({"id": 3, "machine": "tm", "inputs": ["012", "01"]})
+                requests.append({"id": 4, "machine": "missing", "input": "0"})
+                requests.append({"id": 8, "machine": "ends01", "inputs": ["11101", "10", "0101"]})
+                writer.write("".join(json.dumps(r) + "\n" for r in requests).encode())
+                await writer.drain()
+                responses = {}
+                for _ in requests:
+                    response = json.loads(await reader.readline())
+                    responses[response["id"]] = response
+                writer.write(b'{"id": 5, "op": "stats"}\n')
+                await writer.drain()
+                stats = json.loads(await reader.readline())["stats"]
+
+                # A batch request well past asyncio's 64 KiB default line
+                # limit, then bytes that are not UTF-8; the connection must
+                # answer both and stay open.
+                large = {"id": 6, "machine": "even", "inputs": ["1001" * 16] * 2000}
+                writer.write(json.dumps(large).encode() + b"\n" + b"\xff\xfe\n")
+                writer.write(b'{"id": 7, "machine": "even", "input": "00"}\n')
+                await writer.drain()
+                for _ in range(3):
+                    response = json.loads(await reader.readline())
+                    responses[response.get("id", "invalid")] = response
+                writer.close()
+                return responses, stats
+            finally:
+                await server.close()
+
+        responses, stats = asyncio.run(round_trip())
+        results = [responses[i].get("result") for i in range(3)]
+        status = "PASS" if results == ["Accepted", "Rejected", "Accepted"] else "FAIL"
+        print(f"Server Test DFA requests: {results} - {status}")
+        status = "PASS" if stats["even"]["requests"] == 3 and stats["even"]["batches"] == 1 else "FAIL"
+        print(f"Server Test concurrent requests share a batch: {stats['even']['batches']} batch(es) - {status}")
+        status = "PASS" if responses[3].get("results") == ["Accepted", "Rejected"] else "FAIL"
+        print(f"Server Test TM batch in worker process: {responses[3].get('results')} - {status}")
+        status = "PASS" if "error" in responses[4] else "FAIL"
+        print(f"Server Test unknown machine is an error - {status}")
+        status = "PASS" if responses[8].get("results") == ["Accepted", "Rejected", "Accepted"] else "FAIL"
+        print(f"Server Test NFA batch on the bitset simulator: {responses[8].get('results')} - {status}")
+        results = responses[6].get("results", [])
+        status = "PASS" if len(results) == 2000 and set(results) == {"Accepted"} else "FAIL"
+        print(f"Server Test request line over 64 KiB: {len(results)} results - {status}")
+        status = "PASS" if "error" in responses["invalid"] and responses[7].get("result") == "Accepted" else "FAIL"
+        print(f"Server Test invalid UTF-8 gets an error reply and the connection stays open - {status}")
+
+        async def overlong_line():
+            server = AutomatonServer({"even": ("dfa", "dfa_rules.fa")}, workers=1, line_limit=1024)
+            listener = await server.start()
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(b'{"id": 1, "machine": "even", "input": "' + b"0" * 200000 + b'"}\n')
+                writer.write(b'{"id": 2, "machine": "even", "input": "00"}\n')
+                await writer.drain()
+                replies = []
+                while not replies or replies[-1].get("id") != 2:
+                    replies.append(json.loads(await reader.readline()))
+                writer.close()
+                return replies
+            finally:
+                await server.close()
+
+        replies = asyncio.run(overlong_line())
+        status = "PASS" if len(replies) == 2 and "error" in replies[0] \
+            and replies[1].get("result") == "Accepted" else "FAIL"
+        print(f"Server Test line over the limit gets one error reply: {len(replies)} replies - {status}")
+    except Exception as e:
+        print(f"Server test failed with error: {e}", file=sys.stderr)
+    print("-" * 20)
+
     # --- Turing Machine Tests ---
     print("--- Testing Turing Machine ---")
     try:
@@ -86,6 +608,48 @@ def run_tests():
             status = "PASS" if result == expected else "FAIL"
             print(
                 f"TM Test '{string}': {result} (Expected: {expected}) - {status}")
+
+        samples = ["".join(p) for n in range(7)
+                   for p in itertools.product("012", repeat=n)]
+        mismatches = [s for s in samples for limit in (10, 1000)
+                      if tm.simulate_compiled(s, limit) != tm.simulate(s, limit)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"TM Test compiled engine ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        mismatches = [s for s in samples for limit in (10, 1000)
+                      if tm.simulate_accelerated(s, limit) != tm.simulate(s, limit)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"TM Test accelerated engine ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        mismatches = [s for s in samples
+                      if tm.simulate(s, detect_loops=True) != tm.simulate(s)]
+        status = "PASS" if not mismatches else "FAIL"
+        print(
+            f"TM Test loop detection keeps halting results ({len(samples)} strings): {len(mismatches)} mismatches - {status}")
+
+        # Bounces between two cells forever, and runs off to the right forever
+        looping_tm = TuringMachine(
+            ["a", "b", "acc", "rej"], ["0", "1"], ["0", "1", "_"],
+            {("a", "0"): ("b", "0", "R"), ("b", "_"): ("a", "_", "L"),
+             ("a", "1"): ("a", "1", "R"), ("a", "_"): ("a", "1", "R")},
+            "a", "acc", "rej", "_")
+        for string in ("0", "1"):
+            result = looping_tm.simulate(string, detect_loops=True)
+            status = "PASS" if result == "Looping" else "FAIL"
+            print(
+                f"TM Test loop detection '{string}': {result} (Expected: Looping) - {status}")
+
+        # Carries its single 1 one cell to the right every three steps, so no
+        # configuration ever repeats at the same tape position
+        shifting_tm = TuringMachine(
+            ["q", "r", "s", "acc", "rej"], ["1"], ["1", "_"],
+            {("q", "1"): ("r", "_", "R"), ("r", "_"): ("s", "1", "L"), ("s", "_"): ("q", "_", "R")},
+            "q", "acc", "rej", "_")
+        result = shifting_tm.simulate("1", step_limit=10000, detect_loops=True)
+        status = "PASS" if result == "Looping" else "FAIL"
+        print(f"TM Test loop detection on a shifting cycle: {result} (Expected: Looping) - {status}")
     except Exception as e:
         print(f"TM test failed with error: {e}", file=sys.stderr)
     print("-" * 20)
@@ -1,6 +1,18 @@
 import sys
+from array import array
 from read_file import *
 
+NO_TRANSITION = -1
+INVALID_MOVE = -2
+MOVE_DELTAS = {'R': 1, 'L': -1}
+
+# Loop detection hashes the tape as sum(value(symbol) * HASH_BASE**position)
+# modulo a Mersenne prime; scaling by HASH_BASE**-head makes the hash
+# independent of where on the tape the configuration sits.
+HASH_MODULUS = (1 << 61) - 1
+HASH_BASE = 1000003
+HASH_BASE_INVERSE = pow(HASH_BASE, -1, HASH_MODULUS)
+
 
 class TuringMachine:
     def __init__(self, states, input_alphabet, tape_alphabet, transitions, start_state, accept_state, reject_state, blank_symbol='_'):
@@ -15,6 +27,7 @@ class TuringMachine:
         self.tape = {}
         self.head_position = 0
         self.current_state = self.start_state
+        self._compiled = None
 
         if not self.input_alphabet.issubset(self.tape_alphabet):
             raise ValueError(
@@ -32,7 +45,10 @@ class TuringMachine:
         self.head_position = 0
         self.current_state = self.start_state
 
-    def simulate(self, input_string, step_limit=1000):
+    def simulate(self, input_string, step_limit=1000, detect_loops=False):
+        if detect_loops:
+            return self._simulate_detecting_loops(input_string, step_limit)
+
         self._initialize_tape(input_string)
         step = 0
 
@@ -65,28 +81,407 @@ class TuringMachine:
 
         return "Undecided (Step limit reached)"
 
+    def simulate_profiled(self, input_string, profile, step_limit=1000):
+        """
+        Same result as simulate, recording state visits, transition hits and
+        the leftmost and rightmost cells the head reaches in profile (a
+        profiling.Profile).
+        """
+        self._initialize_tape(input_string)
+        visits = profile.state_visits
+        hits = profile.transition_hits
+        profile.runs += 1
+        lowest = highest = 0
+        step = 0
 
-def parse_tm_json(json_path):
-    load_rules(json_path)
+        try:
+            while step < step_limit:
+                visits[self.current_state] += 1
+                if self.current_state == self.accept_state:
+                    return "Accepted"
+                if self.current_state == self.reject_state:
+                    return "Rejected"
 
-    required_sections = {'states', 'input_alphabet', 'tape_alphabet',
-                         'transitions', 'start_state', 'accept_state', 'reject_state', 'blank_symbol'}
-    sections = set(get_sections(json_path))
-    missing = required_sections - sections
-    if missing:
-        raise ValueError(f"Missing required sections in JSON: {missing}")
+                current_symbol = self.tape.get(
+                    self.head_position, self.blank_symbol)
+                transition_key = (self.current_state, current_symbol)
+
+                if transition_key not in self.transitions:
+                    return "Rejected"
+
+                next_state, write_symbol, move = self.transitions[transition_key]
+                hits[(self.current_state, current_symbol, next_state, write_symbol, move)] += 1
 
-    states = get_section_data(json_path, 'states')
-    input_alphabet = get_section_data(json_path, 'input_alphabet')
-    tape_alphabet = get_section_data(json_path, 'tape_alphabet')
-    transitions_data = get_section_data(json_path, 'transitions')
-    start_state = get_section_data(json_path, 'start_state')
-    accept_state = get_section_data(json_path, 'accept_state')
-    reject_state = get_section_data(json_path, 'reject_state')
-    blank_symbol = get_section_data(json_path, 'blank_symbol')
+                self.tape[self.head_position] = write_symbol
+
+                if move.upper() == 'R':
+                    self.head_position += 1
+                    highest = max(highest, self.head_position)
+                elif move.upper() == 'L':
+                    self.head_position -= 1
+                    lowest = min(lowest, self.head_position)
+                else:
+                    raise ValueError(f"Invalid move direction: {move}")
+
+                self.current_state = next_state
+                step += 1
+                profile.steps += 1
+
+            return "Undecided (Step limit reached)"
+        finally:
+            profile.record_tape_extent(lowest, highest)
+
+    def _written_cells(self):
+        """The non-blank cells, keyed by offset from the head."""
+        return {i - self.head_position: s for i, s in self.tape.items() if s != self.blank_symbol}
+
+    def _simulate_detecting_loops(self, input_string, step_limit):
+        """
+        Same as simulate, but returns "Looping" as soon as the machine is
+        proven never to halt. Two cases are recognised:
+
+        - The configuration repeats, possibly shifted along the tape: the
+          same state, and the same non-blank cells relative to the head.
+          A machine has no notion of absolute position, so from there it
+          repeats the same steps, shifted, forever. Configurations are
+          fingerprinted by (state, tape hash relative to the head), where
+          the tape hash is a polynomial hash updated on every write, and
+          compared against a checkpoint that is moved at power-of-two
+          intervals (Brent's cycle detection). A fingerprint match is
+          confirmed against the checkpoint's tape.
+        - The head is past every non-blank cell and the state loops on the
+          blank symbol, moving further out, so it can only run forever.
+        """
+        self._initialize_tape(input_string)
+        blank = self.blank_symbol
+        tape = self.tape
+
+        symbols = self.tape_alphabet | {t[1] for t in self.transitions.values()}
+        values = {symbol: i + 1 for i, symbol in enumerate(sorted(symbols - {blank}))}
+        values[blank] = 0
+        tape_hash = 0
+        for position, symbol in tape.items():
+            tape_hash += values[symbol] * pow(HASH_BASE, position, HASH_MODULUS)
+        tape_hash %= HASH_MODULUS
+        # HASH_BASE**head and its inverse; the head starts at 0.
+        weight = inverse_weight = 1
+        lowest = min(tape) if tape else 0
+        highest = max(tape) if tape else -1
+
+        checkpoint = None
+        checkpoint_tape = None
+        power = 1
+        since_checkpoint = 0
+        step = 0
+
+        while step < step_limit:
+            if self.current_state == self.accept_state:
+                return "Accepted"
+            if self.current_state == self.reject_state:
+                return "Rejected"
+
+            current_symbol = tape.get(self.head_position, blank)
+            transition_key = (self.current_state, current_symbol)
+            if transition_key not in self.transitions:
+                return "Rejected"
+
+            next_state, write_symbol, move = self.transitions[transition_key]
+            direction = move.upper()
+            if direction not in ('R', 'L'):
+                raise ValueError(f"Invalid move direction: {move}")
+
+            fingerprint = (self.current_state, tape_hash * inverse_weight % HASH_MODULUS)
+            if fingerprint == checkpoint and self._written_cells() == checkpoint_tape:
+                return "Looping"
+
+            if next_state == self.current_state and current_symbol == blank:
+                if (direction == 'R' and self.head_position > highest) or \
+                        (direction == 'L' and self.head_position < lowest):
+                    return "Looping"
+
+            since_checkpoint += 1
+            if since_checkpoint == power:
+                checkpoint = fingerprint
+                checkpoint_tape = self._written_cells()
+                power *= 2
+                since_checkpoint = 0
+
+            if write_symbol != current_symbol:
+                tape_hash = (tape_hash + (values[write_symbol] - values[current_symbol]) * weight) % HASH_MODULUS
+            if write_symbol != blank:
+                lowest = min(lowest, self.head_position)
+                highest = max(highest, self.head_position)
+            tape[self.head_position] = write_symbol
+
+            if direction == 'R':
+                self.head_position += 1
+                weight = weight * HASH_BASE % HASH_MODULUS
+                inverse_weight = inverse_weight * HASH_BASE_INVERSE % HASH_MODULUS
+            else:
+                self.head_position -= 1
+                weight = weight * HASH_BASE_INVERSE % HASH_MODULUS
+                inverse_weight = inverse_weight * HASH_BASE % HASH_MODULUS
+            self.current_state = next_state
+            step += 1
+
+        return "Undecided (Step limit reached)"
+
+    def simulate_accelerated(self, input_string, step_limit=1000):
+        """
+        Simulates the machine on a run-length encoded tape. Whenever a state
+        loops on the symbol under the head without changing direction, the
+        whole run of that symbol is crossed in one macro-step. step_limit
+        still counts ordinary (micro) steps, and results match simulate.
+        Afterwards macro_steps and micro_steps hold the counts for the run.
+        """
+        for symbol in input_string:
+            if symbol not in self.input_alphabet:
+                raise ValueError(
+                    f"Symbol '{symbol}' from input string is not in the input alphabet.")
+
+        blank = self.blank_symbol
+        # Runs are [symbol, count] pairs; the last run of each side is the one
+        # next to the head. Past the last run the tape is blank forever.
+        left = []
+        right = []
+        for symbol in reversed(input_string[1:]):
+            if right and right[-1][0] == symbol:
+                right[-1][1] += 1
+            else:
+                right.append([symbol, 1])
+        head = input_string[0] if input_string else blank
 
+        def push(side, symbol, count):
+            if side and side[-1][0] == symbol:
+                side[-1][1] += count
+            else:
+                side.append([symbol, count])
+
+        def pop(side):
+            if not side:
+                return blank
+            run = side[-1]
+            run[1] -= 1
+            if run[1] == 0:
+                side.pop()
+            return run[0]
+
+        state = self.start_state
+        micro_steps = 0
+        macro_steps = 0
+        result = "Undecided (Step limit reached)"
+
+        while micro_steps < step_limit:
+            if state == self.accept_state:
+                result = "Accepted"
+                break
+            if state == self.reject_state:
+                result = "Rejected"
+                break
+
+            transition_key = (state, head)
+            if transition_key not in self.transitions:
+                result = "Rejected"
+                break
+
+            next_state, write_symbol, move = self.transitions[transition_key]
+            direction = move.upper()
+            if direction == 'R':
+                behind, ahead = left, right
+            elif direction == 'L':
+                behind, ahead = right, left
+            else:
+                raise ValueError(f"Invalid move direction: {move}")
+
+            if next_state == state:
+                # The head cell plus the run of equal symbols ahead of it.
+                if ahead and ahead[-1][0] == head:
+                    run_length = 1 + ahead[-1][1]
+                elif not ahead and head == blank:
+                    run_length = step_limit - micro_steps
+                else:
+                    run_length = 1
+                count = min(run_length, step_limit - micro_steps)
+
+                push(behind, write_symbol, count)
+                if count < run_length and ahead:
+                    ahead[-1][1] -= count
+                    if ahead[-1][1] == 0:
+                        ahead.pop()
+                elif count == run_length:
+                    if run_length > 1 and ahead:
+                        ahead.pop()
+                    head = pop(ahead)
+            else:
+                count = 1
+                push(behind, write_symbol, 1)
+                head = pop(ahead)
+
+            state = next_state
+            micro_steps += count
+            macro_steps += 1
+
+        self.current_state = state
+        self.micro_steps = micro_steps
+        self.macro_steps = macro_steps
+        return result
+
+    def compile(self):
+        return CompiledTuringMachine(self)
+
+    def simulate_compiled(self, input_string, step_limit=1000):
+        """Runs the compiled engine; results match simulate."""
+        if self._compiled is None:
+            self._compiled = self.compile()
+        return self._compiled.simulate(input_string, step_limit)
+
+
+class CompiledTuringMachine:
+    """
+    A Turing machine compiled to integer state and symbol ids. Transitions
+    live in three flat arrays indexed by state_id * width + symbol_id (next
+    state, symbol to write and head delta), and the tape is a bytearray that
+    grows in both directions, with origin tracking where cell 0 of the input
+    currently sits.
+    """
+
+    def __init__(self, tm):
+        self.tm = tm
+
+        symbols = [tm.blank_symbol]
+        for symbol in sorted(tm.input_alphabet | tm.tape_alphabet):
+            if symbol not in symbols:
+                symbols.append(symbol)
+        for (_, read), (_, write, _) in tm.transitions.items():
+            for symbol in (read, write):
+                if symbol not in symbols:
+                    symbols.append(symbol)
+        if len(symbols) > 256:
+            raise ValueError(
+                "The compiled engine supports at most 256 tape symbols.")
+
+        # Halting states get the two highest ids so one comparison spots them.
+        names = [tm.start_state]
+        for state in sorted(tm.states):
+            if state not in names:
+                names.append(state)
+        for (curr, _), (next_state, _, _) in tm.transitions.items():
+            for state in (curr, next_state):
+                if state not in names:
+                    names.append(state)
+        for state in (tm.accept_state, tm.reject_state):
+            if state in names:
+                names.remove(state)
+        names.extend([tm.accept_state, tm.reject_state])
+
+        self.symbols = symbols
+        self.symbol_ids = {s: i for i, s in enumerate(symbols)}
+        self.state_names = names
+        self.state_ids = {s: i for i, s in enumerate(names)}
+        self.accept_id = self.state_ids[tm.accept_state]
+        self.reject_id = self.state_ids[tm.reject_state]
+        self.halt_base = min(self.accept_id, self.reject_id)
+        self.width = len(symbols)
+
+        size = len(names) * self.width
+        self.next_states = array('i', [NO_TRANSITION]) * size
+        self.writes = array('B', [0]) * size
+        self.deltas = array('b', [0]) * size
+        self.invalid_moves = {}
+        for (curr, read), (next_state, write, move) in tm.transitions.items():
+            i = self.state_ids[curr] * self.width + self.symbol_ids[read]
+            delta = MOVE_DELTAS.get(move.upper())
+            if delta is None:
+                # Only an error if the transition is actually taken.
+                self.next_states[i] = INVALID_MOVE
+                self.invalid_moves[i] = move
+                continue
+            self.next_states[i] = self.state_ids[next_state]
+            self.writes[i] = self.symbol_ids[write]
+            self.deltas[i] = delta
+
+        self.tape = bytearray()
+        self.origin = 0
+        self.head_position = 0
+        self.current_state = tm.start_state
+        self.steps = 0
+
+    def _load_tape(self, input_string):
+        for symbol in input_string:
+            if symbol not in self.tm.input_alphabet:
+                raise ValueError(
+                    f"Symbol '{symbol}' from input string is not in the input alphabet.")
+        tape = bytearray(self.symbol_ids[symbol] for symbol in input_string)
+        # Leave some blank room on both sides so growth is rare.
+        margin = max(16, len(tape))
+        return bytearray(margin) + tape + bytearray(margin), margin
+
+    def simulate(self, input_string, step_limit=1000):
+        tape, origin = self._load_tape(input_string)
+        next_states = self.next_states
+        writes = self.writes
+        deltas = self.deltas
+        width = self.width
+        halt_base = self.halt_base
+
+        state = self.state_ids[self.tm.start_state]
+        position = origin
+        size = len(tape)
+        step = 0
+        result = "Undecided (Step limit reached)"
+
+        while step < step_limit:
+            if state >= halt_base:
+                result = "Accepted" if state == self.accept_id else "Rejected"
+                break
+
+            i = state * width + tape[position]
+            next_state = next_states[i]
+            if next_state < 0:
+                if next_state == INVALID_MOVE:
+                    raise ValueError(f"Invalid move direction: {self.invalid_moves[i]}")
+                result = "Rejected"
+                break
+
+            tape[position] = writes[i]
+            position += deltas[i]
+            if not 0 <= position < size:
+                # Double the tape on the side the head ran off.
+                if position < 0:
+                    tape[0:0] = bytearray(size)
+                    position += size
+                    origin += size
+                else:
+                    tape.extend(bytearray(size))
+                size = len(tape)
+
+            state = next_state
+            step += 1
+
+        self.tape = tape
+        self.origin = origin
+        self.head_position = position - origin
+        self.current_state = self.state_names[state]
+        self.steps = step
+        return result
+
+    def tape_contents(self):
+        """Returns the written part of the tape as a string, blanks trimmed."""
+        blank = 0
+        cells = self.tape
+        start = 0
+        end = len(cells)
+        while start < end and cells[start] == blank:
+            start += 1
+        while end > start and cells[end - 1] == blank:
+            end -= 1
+        return "".join(self.symbols[c] for c in cells[start:end])
+
+
+def parse_tm_json(json_path):
     transitions = {}
-    for t in transitions_data:
+
+    def add_transition(t):
         required = ['current_state', 'read', 'next_state', 'write', 'move']
         if any(k not in t for k in required):
             raise ValueError("Transition missing required keys")
@@ -98,6 +493,23 @@ def parse_tm_json(json_path):
 
         transitions[key] = (t['next_state'], t['write'], t['move'])
 
+    rules = stream_rules(json_path, {'transitions': add_transition})
+
+    required_sections = {'states', 'input_alphabet', 'tape_alphabet',
+                         'transitions', 'start_state', 'accept_state', 'reject_state', 'blank_symbol'}
+    sections = set(rules.keys())
+    missing = required_sections - sections
+    if missing:
+        raise ValueError(f"Missing required sections in JSON: {missing}")
+
+    states = rules['states']
+    input_alphabet = rules['input_alphabet']
+    tape_alphabet = rules['tape_alphabet']
+    start_state = rules['start_state']
+    accept_state = rules['accept_state']
+    reject_state = rules['reject_state']
+    blank_symbol = rules['blank_symbol']
+
     return TuringMachine(states, input_alphabet, tape_alphabet, transitions, start_state, accept_state, reject_state, blank_symbol)
 
 
@@ -109,9 +521,10 @@ if __name__ == '__main__':
         else:
             rules_file = input("Input your rule filename: ")
             input_string = input("Input your input string: ")
+        detect_loops = "--detect-loops" in sys.argv[3:]
 
         tm = parse_tm_json(rules_file)
-        result = tm.simulate(input_string)
+        result = tm.simulate(input_string, detect_loops=detect_loops)
 
         print(
             f"The string \"{input_string}\" parsed through the Turing Machine emulator returns: {result}")